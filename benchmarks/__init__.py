@@ -0,0 +1,5 @@
+"""
+Benchmarks package
+
+Micro-benchmarks of the code that runs on every completed scan, run with `python -m benchmarks`.
+"""
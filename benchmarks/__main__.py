@@ -0,0 +1,105 @@
+"""
+Per-scan hot path benchmarks
+
+Usage:
+    python -m benchmarks                     # run and compare with benchmarks/baseline.json
+    python -m benchmarks --update-baseline   # run and store results as the new baseline
+    python -m benchmarks -k keyboard         # run only benchmarks matching a substring
+
+Exits with code 1 if any benchmark regressed beyond the thresholds.
+Baselines are machine-specific, regenerate them on the machine that runs the comparison.
+"""
+
+import argparse
+import os
+import sys
+
+# Headless rendering; the benchmarks never call Pomelo API, but importing bot package creates its client
+os.environ.setdefault("MPLBACKEND", "Agg")
+os.environ.setdefault("POMELO_API_TOKEN", "benchmark")
+
+from bot import messages
+from bot.keyboards import open_link_button_keyboard
+from entities.scan_entity import AdiImageProfile, ScanEntity
+
+from benchmarks.fixtures import get_fixtures
+from benchmarks.runner import measure, load_baseline, save_baseline, compare, format_change
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+PROGRESS_STATUSES = ("recognition_pending", "recognizing", "analyzing", "completed")
+
+
+def get_benchmarks() -> dict:
+    """Return benchmark callables by name ("<function>/<fixture>")"""
+    benchmarks = {}
+    # Default profile, so ADI_IMAGE_* env variables don't change the results
+    profile = AdiImageProfile()
+
+    for fixture, entity in get_fixtures().items():
+        buttons = entity.get_ingredient_buttons()
+        names = [ingredient["name"] for ingredient in entity.ingredients]
+
+        benchmarks.update({
+            f"get_adi_image_buffer/{fixture}": lambda entity=entity: ScanEntity.get_adi_image_buffer(entity, profile),
+            f"get_ingredient_buttons/{fixture}": entity.get_ingredient_buttons,
+            f"get_scan_msg/{fixture}": lambda entity=entity: messages.get_scan_msg(entity),
+            f"open_link_button_keyboard/{fixture}": lambda buttons=buttons: open_link_button_keyboard(buttons),
+            f"text_to_slug/{fixture}": lambda names=names: [ScanEntity.text_to_slug(name) for name in names],
+        })
+
+    # Doesn't depend on scan contents: one call per progress update
+    benchmarks["get_progress_bar_msg"] = lambda: [messages.get_progress_bar_msg(status) for status in PROGRESS_STATUSES]
+
+    return benchmarks
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Per-scan hot path benchmarks")
+    parser.add_argument("-k", dest="pattern", default="", help="Run only benchmarks containing this substring")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--update-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed time regression (0.25 = +25%%)")
+    parser.add_argument("--alloc-threshold", type=float, default=0.10, help="Allowed peak allocation regression")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats, the best one is compared")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    failed = []
+
+    print(f"{'benchmark':<40} {'time, us':>12} {'median, us':>12} {'peak, KiB':>10} {'vs base':>9}")
+    for name, func in get_benchmarks().items():
+        if args.pattern not in name:
+            continue
+
+        result = measure(func, repeat=args.repeat)
+        results[name] = result
+
+        regressions = compare(result, baseline.get(name), args.threshold, args.alloc_threshold)
+        if regressions:
+            failed.append(f"{name}: {', '.join(regressions)}")
+
+        print(
+            f"{name:<40} {result['time_us']:>12.1f} {result['median_us']:>12.1f} {result['peak_kib']:>10.1f} "
+            f"{format_change(result, baseline.get(name)):>9}{'  REGRESSED' if regressions else ''}"
+        )
+
+    if args.update_baseline:
+        # Keep baselines of benchmarks filtered out by -k
+        save_baseline(args.baseline, {**baseline, **results})
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if failed:
+        print(f"\n{len(failed)} benchmark(s) regressed:")
+        for line in failed:
+            print(f"  {line}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
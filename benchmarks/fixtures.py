@@ -0,0 +1,100 @@
+"""
+Scan payload fixtures
+
+Deterministic completed-scan payloads shaped like Pomelo API responses:
+small (a few ingredients), 50-ingredient and 200-ingredient compositions.
+"""
+
+import random
+
+from entities.scan_entity import ScanEntity
+
+
+# (name, danger) pairs, names of various lengths including ones truncated on buttons
+INGREDIENTS = [
+    ("Вода", 0),
+    ("Сахар", 2),
+    ("Соль поваренная пищевая", 1),
+    ("Мука пшеничная хлебопекарная высшего сорта", 1),
+    ("Масло подсолнечное рафинированное дезодорированное", 1),
+    ("Молоко сухое обезжиренное", 1),
+    ("Крахмал кукурузный модифицированный", 2),
+    ("Лецитин соевый", 1),
+    ("Лимонная кислота", 1),
+    ("Аскорбиновая кислота", 0),
+    ("Сорбат калия", 3),
+    ("Бензоат натрия", 5),
+    ("Глутамат натрия", 4),
+    ("Каррагинан", 3),
+    ("Ксантановая камедь", 2),
+    ("Моно- и диглицериды жирных кислот", 3),
+    ("Ароматизатор идентичный натуральному «Ваниль»", 2),
+    ("Краситель кармин", 4),
+    ("Краситель сахарный колер IV", 4),
+    ("Тартразин", 5),
+    ("Аспартам", 5),
+    ("Ацесульфам калия", 4),
+    ("Пектин яблочный", 0),
+    ("Желатин пищевой", 1),
+    ("Дрожжи хлебопекарные прессованные", 0),
+    ("Какао-порошок алкализованный", 1),
+    ("Пальмовое масло", 3),
+    ("Сироп глюкозно-фруктозный", 3),
+    ("Экстракт паприки", 1),
+    ("Нитрит натрия", 5),
+    ("Трифосфаты", 4),
+    ("Антиокислитель экстракт розмарина", 1),
+    ("Неизвестный компонент", -1),
+]
+
+ALLERGENS = ["молоко", "глютен", "соя", "орехи", "кунжут", "горчица", "яйца", "сельдерей"]
+
+AI_ANALYSIS = (
+    "Продукт содержит несколько добавок средней и высокой степени вредности. "
+    "Консерванты и усилители вкуса лучше ограничивать, особенно детям. "
+    "Высокое содержание сахара и пальмового масла делает продукт калорийным. "
+    "Рекомендуем употреблять его не чаще одного-двух раз в неделю."
+)
+
+SIZES = {
+    "small": 5,
+    "medium": 50,
+    "large": 200,
+}
+
+
+def make_scan_payload(ingredient_count: int, seed: int = 0) -> dict:
+    """Build completed scan payload with ingredient_count ingredients"""
+    rng = random.Random(seed)
+    ingredients = []
+
+    for index in range(ingredient_count):
+        name, danger = INGREDIENTS[index % len(INGREDIENTS)]
+        if index >= len(INGREDIENTS):
+            # Keep names (and button texts) unique like in a real long composition
+            name = f"{name} {index // len(INGREDIENTS) + 1}"
+
+        ingredients.append({
+            "name": name,
+            "danger": danger,
+            # Some ingredients have no reference page, the keyboard builds a search URL for them
+            "referenceUrl": f"https://proe.info/ru/additives/{index}" if rng.random() < 0.6 else None,
+        })
+
+    return {
+        "id": f"bench-{ingredient_count}",
+        "name": f"Тестовый продукт ({ingredient_count} ингредиентов)",
+        "status": "completed",
+        "composition": ", ".join(ingredient["name"] for ingredient in ingredients),
+        "aiAnalysis": AI_ANALYSIS,
+        "analysis": {
+            "additivesDangerIndex": min(100, 20 + ingredient_count // 3),
+            "allergens": ALLERGENS[:max(1, ingredient_count // 25)],
+            "ingredients": ingredients,
+        },
+    }
+
+
+def get_fixtures() -> dict[str, ScanEntity]:
+    """Return scan entities by fixture name"""
+    return {name: ScanEntity(make_scan_payload(count)) for name, count in SIZES.items()}
@@ -0,0 +1,90 @@
+"""
+Benchmark runner
+
+Measures time and allocations of a callable and compares results with a stored baseline.
+"""
+
+import gc
+import json
+import os
+import statistics
+import timeit
+import tracemalloc
+from typing import Callable, Optional
+
+
+# Allocation differences below this are noise (interned strings, free lists, ...)
+MIN_ALLOC_DIFF_KIB = 1.0
+
+
+def measure(func: Callable[[], object], repeat: int = 5) -> dict:
+    """
+    Measure callable.
+
+    Returns:
+        dict: Time per call in microseconds (best and median of repeats) and peak allocated KiB per call
+    """
+    func()  # Warm up: imports, caches, font loading
+
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    timings = [total / number * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time_us": round(min(timings), 2),
+        "median_us": round(statistics.median(timings), 2),
+        "peak_kib": round((peak - before) / 1024, 2),
+    }
+
+
+def load_baseline(path: str) -> dict:
+    """Load baseline results, empty if there is no baseline yet"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as baseline:
+        return json.load(baseline)
+
+
+def save_baseline(path: str, results: dict) -> None:
+    """Store results as the new baseline"""
+    with open(path, "w", encoding="utf-8") as baseline:
+        json.dump(results, baseline, indent=2, sort_keys=True, ensure_ascii=False)
+        baseline.write("\n")
+
+
+def compare(result: dict, baseline: Optional[dict], time_threshold: float, alloc_threshold: float) -> list[str]:
+    """
+    Compare result with its baseline.
+
+    Returns:
+        list[str]: Regressions, empty if result is within thresholds
+    """
+    if baseline is None:
+        return []
+
+    regressions = []
+    if result["time_us"] > baseline["time_us"] * (1 + time_threshold):
+        regressions.append(f"time {baseline['time_us']:.1f} -> {result['time_us']:.1f} us")
+
+    alloc_diff = result["peak_kib"] - baseline["peak_kib"]
+    if alloc_diff > MIN_ALLOC_DIFF_KIB and result["peak_kib"] > baseline["peak_kib"] * (1 + alloc_threshold):
+        regressions.append(f"peak {baseline['peak_kib']:.1f} -> {result['peak_kib']:.1f} KiB")
+
+    return regressions
+
+
+def format_change(result: dict, baseline: Optional[dict]) -> str:
+    """Format relative time change against baseline"""
+    if baseline is None or not baseline["time_us"]:
+        return "new"
+    return f"{(result['time_us'] / baseline['time_us'] - 1) * 100:+.1f}%"
@@ -10,6 +10,7 @@ from .start import register_start_handlers
 from .help import register_help_handlers
 from .about import register_about_handlers
 from .disclaimer import register_disclaimer_handlers
+from .history import register_history_handlers
 from .scanner import register_scanner_handlers
 
 
@@ -19,5 +20,6 @@ def register_all_handlers(dp):
     register_help_handlers(dp)
     register_about_handlers(dp)
     register_disclaimer_handlers(dp)
+    register_history_handlers(dp)
     register_scanner_handlers(dp)
 
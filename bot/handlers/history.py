@@ -0,0 +1,84 @@
+from maxapi import F
+from maxapi.types import MessageCreated, MessageCallback
+from maxapi.filters.command import Command
+from maxapi.enums.parse_mode import ParseMode
+
+from bot import messages
+from bot.keyboards import history_keyboard
+from bot.helpers import send_scan_result
+from bot.services import scan_history, adi_image_profile
+
+
+# Number of scans per history page
+PAGE_SIZE = 5
+
+
+def register_history_handlers(dp):
+    """Register history-related handlers"""
+
+    @dp.message_created(Command("history"))
+    async def history(event: MessageCreated) -> None:
+        """Handles /history command"""
+        user_id = str(event.from_user.user_id)
+        text, attachments = await _get_history_page(user_id, 0)
+        await event.message.answer(
+            text=text,
+            parse_mode=ParseMode.MARKDOWN,
+            attachments=attachments
+        )
+
+    @dp.message_callback(F.callback.payload.startswith("history:page:"))
+    async def history_page(event: MessageCallback) -> None:
+        """Switch history page"""
+        user_id = str(event.callback.user.user_id)
+        page = int(event.callback.payload.split(":")[2])
+
+        text, attachments = await _get_history_page(user_id, page)
+        await event.bot.send_callback(callback_id=event.callback.callback_id)
+        await event.bot.edit_message(
+            message_id=event.message.body.mid,
+            text=text,
+            parse_mode=ParseMode.MARKDOWN,
+            attachments=attachments
+        )
+
+    @dp.message_callback(F.callback.payload.startswith("history:show:"))
+    async def history_show(event: MessageCallback) -> None:
+        """Re-send stored scan result, Pomelo API is not called"""
+        user_id = str(event.callback.user.user_id)
+        entry_id = int(event.callback.payload.split(":")[2])
+
+        entry = await scan_history.get(user_id, entry_id)
+        if entry is None:
+            await event.bot.send_callback(
+                callback_id=event.callback.callback_id,
+                notification=messages.HISTORY_NOT_FOUND_MSG
+            )
+            return
+
+        scan_entity, adi_image = entry
+        if adi_image is None:
+            adi_image = scan_entity.get_adi_image_buffer(scan_entity, adi_image_profile)
+
+        await event.bot.send_callback(callback_id=event.callback.callback_id)
+        await send_scan_result(
+            event.bot,
+            event.message.recipient.chat_id,
+            {'msg_id': None},
+            scan_entity,
+            adi_image
+        )
+
+
+async def _get_history_page(user_id: str, page: int) -> tuple[str, list]:
+    """Build history page text and keyboard"""
+    # Fetch one extra row to know whether there is a next page
+    entries = await scan_history.recent(user_id, PAGE_SIZE + 1, page * PAGE_SIZE)
+    has_next = len(entries) > PAGE_SIZE
+    entries = entries[:PAGE_SIZE]
+
+    if not entries:
+        return messages.HISTORY_EMPTY_MSG, []
+
+    keyboard = history_keyboard(entries, page, has_next)
+    return messages.get_history_msg(entries, page), [keyboard.as_markup()]
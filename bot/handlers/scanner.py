@@ -1,18 +1,25 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
 from maxapi import F
-from maxapi.types import MessageCreated, InputMediaBuffer
+from maxapi.types import MessageCreated
 from maxapi.filters.command import Command
 from maxapi.enums.parse_mode import ParseMode
 
 from bot import messages
-from bot.keyboards import open_link_button_keyboard
-from bot.helpers import send_or_edit_message
-from services.pomelo_service import PomeloService
+from bot.helpers import send_or_edit_message, send_scan_result
+from bot.services import (
+    pomelo_service, scan_tracker, composition_filter, scan_history, scan_journal, adi_image_profile,
+    memory_monitor
+)
+from entities.scan_entity import ScanEntity
+from services.pomelo_service import PomeloError, PomeloUnavailableError
 from services.scan_tracker import ScanTracker
+from services.composition_filter import CompositionFilter
 
 
-# Create Pomelo service
-pomelo_service = PomeloService()
-scan_tracker = ScanTracker(pomelo_service)
+logger = logging.getLogger(__name__)
 
 
 def register_scanner_handlers(dp):
@@ -29,37 +36,154 @@ def register_scanner_handlers(dp):
     @dp.message_created(F.message.body.attachments)
     async def createPhotoScan(event: MessageCreated) -> None:
         """Image handler"""
+        if await _is_overloaded(event):
+            return
+
         # Get image from user message (if image > 1, take the first one)
         image = event.message.body.attachments[0].payload.url
 
-        # Send image scan to Pomelo API
-        scan_entity = await pomelo_service.createPhotoScan(image)
-        scan_id = scan_entity.id
-
-        # Start scan tracking
-        await _track_scan(event, scan_id)
+        # Download photo, its contents are the de-duplication key
+        try:
+            photo = await pomelo_service.downloadPhoto(image)
+        except PomeloError as e:
+            await _answer_scan_error(event, e)
+            return
+
+        # Send image scan to Pomelo API (or join identical scan in progress) and track it
+        await _track_scan(
+            event,
+            ScanTracker.photo_key(photo),
+            lambda: pomelo_service.createPhotoScan(photo)
+        )
 
     @dp.message_created(F.message.body.text)
     async def createTextScan(event: MessageCreated) -> None:
         """Text handler"""
-        # Get text from user
-        text = event.message.body.text
+        if await _is_overloaded(event):
+            return
+
+        # Get text from user and filter out everything that is not a composition locally
+        result = composition_filter.check(event.message.body.text)
+        if not result.accepted:
+            await _answer_not_composition(event, result.reason)
+            return
+        text = result.text
+
+        # Send text scan to Pomelo API (or join identical scan in progress) and track it
+        await _track_scan(
+            event,
+            ScanTracker.text_key(text),
+            lambda: pomelo_service.createTextScan(text)
+        )
+
+
+async def _is_overloaded(event: MessageCreated) -> bool:
+    """Shed new scans while the process is above its memory soft limit"""
+    if not memory_monitor.shedding:
+        return False
+    await event.message.answer(text=messages.SERVICE_DEGRADED_MSG, parse_mode=ParseMode.MARKDOWN)
+    return True
 
-        # Send text scan to Pomelo API
-        scan_entity = await pomelo_service.createTextScan(text)
-        scan_id = scan_entity.id
 
-        # Start scan tracking
-        await _track_scan(event, scan_id)
+async def _answer_not_composition(event: MessageCreated, reason: str) -> None:
+    """Explain what to send instead of scanning text that is not a composition"""
+    if reason == CompositionFilter.COMMAND:
+        text = messages.UNKNOWN_COMMAND_MSG
+    else:
+        text = messages.NOT_COMPOSITION_MSG
+    await event.message.answer(text=text, parse_mode=ParseMode.MARKDOWN)
 
 
-async def _track_scan(event: MessageCreated, scan_id: str) -> None:
-    """Track scan progress and update user with the scan result"""
+async def _answer_scan_error(event: MessageCreated, error: PomeloError) -> None:
+    """Tell user that scan could not be created"""
+    if isinstance(error, PomeloUnavailableError):
+        text = messages.SERVICE_DEGRADED_MSG
+    else:
+        text = messages.SCAN_CREATE_ERROR_MSG
+    await event.message.answer(text=text, parse_mode=ParseMode.MARKDOWN)
+
+
+async def _track_scan(
+    event: MessageCreated,
+    key: str,
+    create_scan: Callable[[], Awaitable[ScanEntity]]
+) -> None:
+    """Start or join scan, track its progress and update user with the scan result"""
     user_id = str(event.from_user.user_id)
+    chat_id = event.chat.chat_id
 
     # Message ID holder
     msg_id_holder = {'msg_id': None}
 
+    try:
+        scan_id = await scan_tracker.start_scan(
+            user_id,
+            key,
+            create_scan,
+            *_scan_callbacks(event.bot, chat_id, user_id, msg_id_holder)
+        )
+    except PomeloError as e:
+        await _answer_scan_error(event, e)
+        return
+
+    # Check if user already has active scan
+    if scan_id is None:
+        await event.message.answer(text="Сканирование уже идёт. Пожалуйста, подождите.")
+        return
+
+    # Journal the scan so it survives restarts (unless it has already finished)
+    if user_id in scan_tracker.active_scans:
+        scan_journal.start(user_id, scan_id, chat_id, msg_id_holder['msg_id'], None)
+
+
+async def resume_scans(bot, entries: list[dict]) -> None:
+    """Re-attach to scans interrupted by a restart and finish their original progress messages"""
+    await asyncio.gather(*(_resume_scan(bot, entry) for entry in entries))
+
+
+async def _resume_scan(bot, entry: dict) -> None:
+    """Re-attach to a single journaled scan"""
+    user_id = entry['user_id']
+    scan_id = entry['scan_id']
+    msg_id_holder = {'msg_id': entry['msg_id']}
+
+    logger.info(f"Resuming scan {scan_id} of user {user_id}")
+    try:
+        resumed_id = await scan_tracker.start_scan(
+            user_id,
+            f"scan:{scan_id}",
+            lambda: pomelo_service.getScanResult(scan_id),
+            *_scan_callbacks(bot, entry['chat_id'], user_id, msg_id_holder)
+        )
+    except PomeloError as e:
+        logger.error(f"Failed to resume scan {scan_id}: {e}")
+        scan_journal.finish(user_id, scan_id)
+        await send_or_edit_message(
+            bot,
+            entry['chat_id'],
+            msg_id_holder,
+            messages.SCAN_CREATE_ERROR_MSG,
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+
+    # User sent a new product before the resume attached, the new scan replaces this one
+    if resumed_id is None:
+        logger.info(f"Scan {scan_id} of user {user_id} superseded by a newer scan, not resuming")
+        scan_journal.finish(user_id, scan_id)
+        if msg_id_holder['msg_id'] is not None:
+            await send_or_edit_message(
+                bot,
+                entry['chat_id'],
+                msg_id_holder,
+                messages.SCAN_SUPERSEDED_MSG,
+                parse_mode=ParseMode.MARKDOWN
+            )
+
+
+def _scan_callbacks(bot, chat_id: int, user_id: str, msg_id_holder: dict) -> tuple:
+    """Build (on_status, on_complete, on_error) callbacks updating the chat's progress message"""
+
     # Callback for status updates
     async def on_status(status: str, scan_entity) -> None:
         """Handle non-terminal status updates"""
@@ -68,65 +192,59 @@ async def _track_scan(event: MessageCreated, scan_id: str) -> None:
         # Send message only if there's new status
         if len(progress_text) > 0:
             await send_or_edit_message(
-                event.bot,
-                event.chat.chat_id,
+                bot,
+                chat_id,
                 msg_id_holder,
                 progress_text,
                 parse_mode=ParseMode.MARKDOWN
             )
 
+        scan_journal.update(user_id, msg_id=msg_id_holder['msg_id'], status=status)
+
     # Callback for scan completion
     async def on_complete(scan_entity) -> None:
         """Handle scan completion"""
-        # Update message with loading status
-        await send_or_edit_message(
-            event.bot,
-            event.chat.chat_id,
-            msg_id_holder,
-            "Сканирование завершено. Загружаю результат..."
-        )
+        try:
+            # Update message with loading status
+            await send_or_edit_message(
+                bot,
+                chat_id,
+                msg_id_holder,
+                "Сканирование завершено. Загружаю результат..."
+            )
 
-        # Prepare response
-        buttons = scan_entity.get_ingredient_buttons()
-        attachments = [InputMediaBuffer(scan_entity.get_adi_image_buffer(scan_entity))]
+            adi_image = scan_entity.get_adi_image(adi_image_profile)
+            await send_scan_result(bot, chat_id, msg_id_holder, scan_entity, adi_image)
+        finally:
+            scan_journal.finish(user_id)
 
-        # Add buttons if links exist
-        if buttons:
-            attachments.append(open_link_button_keyboard(buttons).as_markup())
-
-        # Edit message with scan results
-        await send_or_edit_message(
-            event.bot,
-            event.chat.chat_id,
-            msg_id_holder,
-            text=messages.get_scan_msg(scan_entity)[0],
-            parse_mode=ParseMode.MARKDOWN,
-            attachments=attachments
-        )
-
-        # Send additional message with components
-        await event.message.answer(
-            text=messages.get_scan_msg(scan_entity)[1],
-            parse_mode=ParseMode.MARKDOWN,
-        )
+        # Save to local history, so /history can serve it without upstream
+        try:
+            await scan_history.add(user_id, scan_entity, adi_image)
+        except Exception as e:
+            logger.error(f"Failed to save scan {scan_entity.id} to history: {e}")
 
     # Callback for errors
     async def on_error(error_msg: str) -> None:
         """Handle scan errors"""
+        scan_journal.finish(user_id)
+
+        # Upstream is degraded, don't show raw connection errors
+        if pomelo_service.breaker.is_open:
+            await send_or_edit_message(
+                bot,
+                chat_id,
+                msg_id_holder,
+                messages.SERVICE_DEGRADED_MSG,
+                parse_mode=ParseMode.MARKDOWN
+            )
+            return
+
         await send_or_edit_message(
-            event.bot,
-            event.chat.chat_id,
+            bot,
+            chat_id,
             msg_id_holder,
             f"Ошибка: {error_msg}"
         )
 
-    # Check if user already has active scan
-    if not await scan_tracker.track_scan(
-        user_id=user_id,
-        scan_id=scan_id,
-        on_status=on_status,
-        on_complete=on_complete,
-        on_error=on_error
-    ):
-        await event.message.answer(text="Сканирование уже идёт. Пожалуйста, подождите.")
-
+    return on_status, on_complete, on_error
@@ -2,6 +2,12 @@
 Helper functions for bot operations
 """
 
+from maxapi.types import InputMediaBuffer
+from maxapi.enums.parse_mode import ParseMode
+
+from bot import messages
+from bot.keyboards import open_link_button_keyboard
+
 
 async def send_or_edit_message(bot, chat_id, msg_id_holder: dict, text: str, **kwargs):
     """
@@ -31,3 +37,41 @@ async def send_or_edit_message(bot, chat_id, msg_id_holder: dict, text: str, **k
             **kwargs
         )
 
+
+async def send_scan_result(bot, chat_id, msg_id_holder: dict, scan_entity, adi_image: bytes) -> None:
+    """
+    Send scan result: summary with ADI gauge and ingredient buttons, then composition.
+
+    Parameters:
+        bot: Bot instance to send/edit messages
+        chat_id: Chat ID where to send the result
+        msg_id_holder: Dictionary with 'msg_id' key, existing message is edited if set
+        scan_entity: Completed ScanEntity
+        adi_image: Rendered ADI gauge image
+    """
+    # Prepare response
+    buttons = scan_entity.get_ingredient_buttons()
+    attachments = [InputMediaBuffer(adi_image)]
+
+    # Add buttons if links exist
+    if buttons:
+        attachments.append(open_link_button_keyboard(buttons).as_markup())
+
+    scan_msg = messages.get_scan_msg(scan_entity)
+
+    # Send or edit message with scan results
+    await send_or_edit_message(
+        bot,
+        chat_id,
+        msg_id_holder,
+        text=scan_msg[0],
+        parse_mode=ParseMode.MARKDOWN,
+        attachments=attachments
+    )
+
+    # Send additional message with components
+    await bot.send_message(
+        chat_id=chat_id,
+        text=scan_msg[1],
+        parse_mode=ParseMode.MARKDOWN
+    )
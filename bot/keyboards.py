@@ -1,5 +1,5 @@
 from maxapi.utils.inline_keyboard import InlineKeyboardBuilder
-from maxapi.types import LinkButton
+from maxapi.types import LinkButton, CallbackButton
 from entities.scan_entity import ScanEntity
 
 def open_link_button_keyboard(links: dict[str, str | None]) -> InlineKeyboardBuilder:
@@ -23,4 +23,39 @@ def open_link_button_keyboard(links: dict[str, str | None]) -> InlineKeyboardBui
             )
         )
 
-    return builder
\ No newline at end of file
+    return builder
+
+
+def history_keyboard(entries: list[dict], page: int, has_next: bool) -> InlineKeyboardBuilder:
+    """
+    Generate a keyboard for one page of scan history.
+
+    Args:
+        entries (list[dict]): History entries with 'id', 'name' and 'adi' keys.
+        page (int): Current page number (0-based).
+        has_next (bool): Whether there is a next page.
+
+    Returns:
+        InlineKeyboardBuilder: Keyboard with a button per entry and paging buttons.
+    """
+    builder = InlineKeyboardBuilder()
+    for entry in entries:
+        name = entry['name'] if len(entry['name']) <= 30 else entry['name'][:30] + "..."
+        adi = entry['adi'] if entry['adi'] is not None else "?"
+        builder.row(
+            CallbackButton(
+                text=f"{name} · {adi}",
+                payload=f"history:show:{entry['id']}"
+            )
+        )
+
+    # Paging buttons
+    paging = []
+    if page > 0:
+        paging.append(CallbackButton(text="◀️ Новее", payload=f"history:page:{page - 1}"))
+    if has_next:
+        paging.append(CallbackButton(text="Старше ▶️", payload=f"history:page:{page + 1}"))
+    if paging:
+        builder.row(*paging)
+
+    return builder
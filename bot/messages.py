@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from entities.scan_entity import ScanEntity
 
 
@@ -43,12 +45,42 @@ HELP_MSG = """**🕹 Список команд**
 `/start` - перезапустить бота
 `/help` - список команд
 `/scanner` - сканер продуктов
+`/history` - история сканирований
 `/about` - о Pomelo
 `/disclaimer` - дисклеймер
 """
 
 SCANNER_MSG = """**📸 Отправь текст или фото состава, чтобы получить детальный анализ**"""
 
+HISTORY_EMPTY_MSG = """**📜 История пуста**
+
+Отправь текст или фото состава, и результат появится здесь"""
+
+HISTORY_NOT_FOUND_MSG = "Запись не найдена"
+
+NOT_COMPOSITION_MSG = """**🤔 Это не похоже на состав продукта**
+
+Пришли текст состава с упаковки, например:
+_Молоко нормализованное, сахар, крахмал, стабилизатор Е407_
+
+Или просто отправь фото состава 📸"""
+
+UNKNOWN_COMMAND_MSG = """**Неизвестная команда**
+
+""" + HELP_MSG
+
+SERVICE_DEGRADED_MSG = """**⚠ Сервис анализа временно перегружен**
+
+Мы уже знаем о проблеме. Пожалуйста, попробуйте ещё раз через пару минут"""
+
+SCAN_SUPERSEDED_MSG = """**Сканирование прервано перезапуском бота**
+
+Вы уже отправили новый продукт, результат придёт по нему"""
+
+SCAN_CREATE_ERROR_MSG = """**😔 Не удалось начать сканирование**
+
+Попробуйте отправить состав ещё раз"""
+
 def get_progress_bar_msg(status: str) -> str:
     """
     Generate progress bar based on scan status
@@ -76,6 +108,21 @@ def get_progress_bar_msg(status: str) -> str:
 
     return progress_bar
 
+def get_history_msg(entries: list[dict], page: int) -> str:
+    """
+    Generate history page message.
+    """
+    lines = [f"**📜 История сканирований** (стр. {page + 1})", ""]
+
+    for entry in entries:
+        date = datetime.fromtimestamp(entry["created_at"]).strftime("%d.%m.%Y %H:%M")
+        adi = entry["adi"] if entry["adi"] is not None else "?"
+        lines.append(f"* {entry['name']} — вредность {adi}, {date}")
+
+    lines.append("")
+    lines.append("_Выберите скан, чтобы посмотреть результат_")
+    return "\n".join(lines)
+
 def get_scan_msg(scan_entity: ScanEntity) -> list[str]:
     """
     Generate a list of messages representing the scan result.
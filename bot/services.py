@@ -0,0 +1,42 @@
+"""
+Bot service instances
+
+Process-wide service objects shared by handlers, main.py and the admin server.
+"""
+
+import gc
+import os
+
+import matplotlib.pyplot as plt
+
+from entities.scan_entity import AdiImageProfile
+from services.pomelo_service import PomeloService
+from services.scan_tracker import ScanTracker
+from services.memory_monitor import MemoryMonitor
+from services.scan_history import ScanHistory
+from services.composition_filter import CompositionFilter
+from services.scan_journal import ScanJournal
+
+
+# Create Pomelo service
+pomelo_service = PomeloService()
+scan_tracker = ScanTracker(pomelo_service)
+composition_filter = CompositionFilter()
+scan_history = ScanHistory(os.getenv('SCAN_HISTORY_DB', 'data/scan_history.sqlite3'))
+scan_journal = ScanJournal(fsync=os.getenv('SCAN_JOURNAL_FSYNC', '0') == '1')
+
+# Validated once at startup, a bad ADI_IMAGE_* value must not break every completed scan
+adi_image_profile = AdiImageProfile.from_env()
+
+# Memory accounting of scan-related structures
+memory_monitor = MemoryMonitor(
+    interval=float(os.getenv('MEMORY_CHECK_INTERVAL', '60')),
+    soft_limit_mb=float(os.getenv('MEMORY_SOFT_LIMIT_MB', '0')),
+    tracemalloc_frames=int(os.getenv('MEMORY_TRACEMALLOC_FRAMES', '0')),
+)
+memory_monitor.register_gauge('active_scans', lambda: len(scan_tracker.active_scans))
+memory_monitor.register_gauge('scan_flights', lambda: len(scan_tracker.flights))
+memory_monitor.register_gauge('active_subscriptions', lambda: len(pomelo_service._active_subscriptions))
+memory_monitor.register_gauge('open_figures', lambda: len(plt.get_fignums()))
+# Allocations pending per GC generation, O(1) unlike len(gc.get_objects())
+memory_monitor.register_gauge('gc_pending', lambda: sum(gc.get_count()))
@@ -0,0 +1,319 @@
+"""
+Multi-process worker mode
+
+The supervisor process is the only one polling MAX for updates. Every update is
+routed to a worker process by chat_id, so all updates of one chat are handled by
+the same worker in order, and the one-active-scan-per-user rule holds there.
+Crashed workers are restarted, on shutdown workers drain their pending updates first.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import zlib
+from asyncio.exceptions import TimeoutError as AsyncioTimeoutError
+from multiprocessing.connection import Connection
+from typing import Callable, Optional
+
+from aiohttp import ClientConnectorError
+from maxapi import Bot, Dispatcher
+from maxapi.types.errors import Error
+from maxapi.methods.types.getted_updates import process_update_webhook
+
+from services.admin_server import AdminServer
+
+
+logger = logging.getLogger(__name__)
+
+# Same delays as maxapi's own polling loop
+CONNECTION_RETRY_DELAY = 30
+GET_UPDATES_RETRY_DELAY = 5
+
+# Worker restart backoff: a worker that lived less than WORKER_STABLE_UPTIME crashed at startup
+WORKER_STABLE_UPTIME = 60
+WORKER_RESTART_BASE_DELAY = 1
+WORKER_RESTART_MAX_DELAY = 60
+WORKER_MAX_QUICK_RESTARTS = 10
+
+
+def get_update_chat_id(update: dict) -> int:
+    """Extract chat ID from raw update JSON"""
+    if update.get('chat_id') is not None:
+        return update['chat_id']
+
+    message = update.get('message') or {}
+    recipient = message.get('recipient') or {}
+    if recipient.get('chat_id') is not None:
+        return recipient['chat_id']
+
+    chat = update.get('chat') or {}
+    return chat.get('chat_id') or 0
+
+
+def get_shard(update: dict, workers: int) -> int:
+    """Return index of the worker that owns update's chat"""
+    return zlib.crc32(str(get_update_chat_id(update)).encode()) % workers
+
+
+async def dispatch_updates(dp: Dispatcher, bot: Bot, updates: Connection) -> None:
+    """
+    Worker side: handle raw updates from the supervisor pipe until a None sentinel arrives.
+    Updates are handled one by one to keep per-chat ordering.
+    """
+    loop = asyncio.get_running_loop()
+
+    # Same preparation as Dispatcher.start_polling, without polling
+    dp.bot = bot
+    dp.routers += [dp]
+    for router in dp.routers:
+        router.bot = bot
+    await dp.check_me()
+
+    while True:
+        try:
+            update = await loop.run_in_executor(None, updates.recv)
+        except EOFError:
+            logger.warning("Supervisor closed the update pipe, draining")
+            return
+
+        if update is None:
+            logger.info("Worker received shutdown signal, draining")
+            return
+
+        try:
+            event = await process_update_webhook(update, bot)
+            await dp.handle(event)
+        except Exception as e:
+            logger.error(f"Failed to handle update {update.get('update_type')}: {e.__class__} - {e}")
+
+
+class WorkerChannel:
+    """
+    Supervisor side of one worker's update channel.
+
+    Updates are buffered in-process and written by a feeder thread into a pipe read only by
+    the worker. Unlike multiprocessing.Queue, a pipe has no lock shared between processes,
+    so a worker killed while waiting for updates cannot block its successor. Every (re)started
+    worker gets a fresh pipe; updates written into the dead worker's pipe but not read are lost.
+    """
+
+    def __init__(self, ctx):
+        self._ctx = ctx
+        self._pending = queue.SimpleQueue()
+        self._lock = threading.Condition()
+        self._writer: Optional[Connection] = None
+        threading.Thread(target=self._feed, name="worker-channel-feeder", daemon=True).start()
+
+    def connect(self) -> Connection:
+        """Replace the pipe and return its read end for the new worker process"""
+        reader, writer = self._ctx.Pipe(duplex=False)
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = writer
+            self._lock.notify_all()
+        return reader
+
+    def put(self, update: Optional[dict]) -> None:
+        """Queue update for the worker, None asks it to drain and exit"""
+        self._pending.put(update)
+
+    def qsize(self) -> int:
+        """Number of updates not yet written to the pipe"""
+        return self._pending.qsize()
+
+    def _feed(self) -> None:
+        while True:
+            update = self._pending.get()
+            with self._lock:
+                while True:
+                    self._lock.wait_for(lambda: self._writer is not None)
+                    try:
+                        self._writer.send(update)
+                        break
+                    except OSError:
+                        # Worker died, wait for the supervisor to restart it with a new pipe
+                        self._writer.close()
+                        self._writer = None
+
+            if update is None:
+                return
+
+
+class Supervisor:
+    """Starts worker processes, shards updates between them and keeps them alive"""
+
+    def __init__(
+        self,
+        workers: int,
+        create_bot: Callable[[], Bot],
+        worker_target: Callable[[int, Connection], None],
+        drain_timeout: float = 60.0,
+        admin: Optional[AdminServer] = None
+    ):
+        """
+        Args:
+            workers: Number of worker processes
+            create_bot: Factory for the polling bot instance
+            worker_target: Worker process entry point, called with (index, updates pipe read end)
+            drain_timeout: How long workers may finish their work on shutdown (seconds)
+            admin: Admin server reporting polling, queues and workers
+        """
+        self.workers = workers
+        self.create_bot = create_bot
+        self.worker_target = worker_target
+        self.drain_timeout = drain_timeout
+        self.admin = admin
+
+        # spawn: never fork a process with a running event loop and live sockets
+        self._ctx = multiprocessing.get_context('spawn')
+        self._channels = [WorkerChannel(self._ctx) for _ in range(workers)]
+        self._processes: list[Optional[multiprocessing.Process]] = [None] * workers
+        self._started_at = [0.0] * workers
+        self._quick_restarts = [0] * workers
+        self._restart_at: dict[int, float] = {}  # worker index -> when to restart it
+        self._stopping = asyncio.Event()
+        self.failed = False  # gave up restarting a worker
+
+    def _start_worker(self, index: int) -> None:
+        """Start (or restart) worker process with a fresh update pipe"""
+        reader = self._channels[index].connect()
+        process = self._ctx.Process(
+            target=self.worker_target,
+            args=(index, reader),
+            name=f"bot-worker-{index}",
+            daemon=False
+        )
+        process.start()
+        # Worker is the pipe's only reader, a dead worker then breaks the pipe
+        reader.close()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"Worker {index} started (pid {process.pid})")
+
+    def queue_depths(self) -> list[int]:
+        """Return number of pending updates per worker"""
+        return [channel.qsize() for channel in self._channels]
+
+    def workers_alive(self) -> list[bool]:
+        """Return liveness of every worker process"""
+        return [process is not None and process.is_alive() for process in self._processes]
+
+    async def run(self) -> None:
+        """Run supervisor until SIGINT/SIGTERM"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        for index in range(self.workers):
+            self._start_worker(index)
+
+        bot = self.create_bot()
+        if self.admin:
+            self.admin.watch_polling(bot)
+            self.admin.add_check('workers', lambda: (all(self.workers_alive()), self.workers_alive()))
+            self.admin.add_stats('queue_depths', self.queue_depths)
+            await self.admin.start()
+
+        watch_task = asyncio.create_task(self._watch_workers())
+        poll_task = asyncio.create_task(self._poll(bot))
+
+        logger.info(f"Supervisor started with {self.workers} workers")
+        await self._stopping.wait()
+        logger.info("Supervisor is shutting down")
+
+        poll_task.cancel()
+        watch_task.cancel()
+        await asyncio.gather(poll_task, watch_task, return_exceptions=True)
+        await bot.close_session()
+
+        await loop.run_in_executor(None, self._drain)
+        if self.admin:
+            await self.admin.stop()
+
+    async def _poll(self, bot: Bot) -> None:
+        """Long-poll MAX for updates and route them to workers"""
+        while True:
+            try:
+                events = await bot.get_updates(marker=bot.marker_updates)
+            except AsyncioTimeoutError:
+                continue
+            except ClientConnectorError:
+                logger.error(f"Connection error, waiting {CONNECTION_RETRY_DELAY}s")
+                await asyncio.sleep(CONNECTION_RETRY_DELAY)
+                continue
+            except Exception as e:
+                logger.error(f"Failed to get updates: {e.__class__} - {e}, waiting {GET_UPDATES_RETRY_DELAY}s")
+                await asyncio.sleep(GET_UPDATES_RETRY_DELAY)
+                continue
+
+            if isinstance(events, Error):
+                logger.info(f"Failed to get updates: {events}, waiting {GET_UPDATES_RETRY_DELAY}s")
+                await asyncio.sleep(GET_UPDATES_RETRY_DELAY)
+                continue
+
+            bot.marker_updates = events.get('marker')
+
+            for update in events.get('updates', []):
+                self._channels[get_shard(update, self.workers)].put(update)
+
+    async def _watch_workers(self) -> None:
+        """Restart workers that died unexpectedly, backing off when they keep crashing at startup"""
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+
+            for index, process in enumerate(self._processes):
+                if process is None or process.is_alive():
+                    continue
+
+                if index not in self._restart_at:
+                    if now - self._started_at[index] >= WORKER_STABLE_UPTIME:
+                        self._quick_restarts[index] = 0
+                    else:
+                        self._quick_restarts[index] += 1
+
+                    failures = self._quick_restarts[index]
+                    if failures >= WORKER_MAX_QUICK_RESTARTS:
+                        logger.critical(
+                            f"Worker {index} crashed {failures} times in a row right after start, giving up"
+                        )
+                        self.failed = True
+                        self._stopping.set()
+                        return
+
+                    delay = 0 if failures == 0 else min(
+                        WORKER_RESTART_BASE_DELAY * 2 ** (failures - 1), WORKER_RESTART_MAX_DELAY
+                    )
+                    logger.error(
+                        f"Worker {index} (pid {process.pid}) exited with code {process.exitcode}, "
+                        f"restarting in {delay}s"
+                    )
+                    self._restart_at[index] = now + delay
+
+                if now >= self._restart_at[index]:
+                    del self._restart_at[index]
+                    process.close()
+                    self._start_worker(index)
+
+    def _drain(self) -> None:
+        """Ask workers to finish pending updates and scans, then stop them"""
+        for channel in self._channels:
+            channel.put(None)
+
+        deadline = time.monotonic() + self.drain_timeout
+        for index, process in enumerate(self._processes):
+            if process is None:
+                continue
+
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f"Worker {index} did not drain in {self.drain_timeout:.0f}s, terminating")
+                process.terminate()
+                process.join()
+
+        logger.info("All workers stopped")
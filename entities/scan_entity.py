@@ -1,11 +1,65 @@
+from dataclasses import dataclass
 from typing import Optional
 import io
+import logging
+import os
+import time
 import matplotlib.pyplot as plt
 
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AdiImageProfile:
+    """
+    Output profile of the ADI gauge image.
+
+    Attributes:
+        format: "png" (RGB PNG), "png8" (palette-quantised PNG) or "webp"
+        size: Side of the rendered image in pixels (before tight cropping)
+        colors: Palette size for "png8"
+        quality: Encoder quality for "webp" (0-100)
+    """
+    format: str = "png"
+    size: int = 600
+    colors: int = 64
+    quality: int = 80
+
+    # Physical figure side in inches, the gauge geometry is laid out for it
+    FIGURE_INCHES = 5
+    FORMATS = ("png", "png8", "webp")
+
+    def __post_init__(self):
+        if self.format not in self.FORMATS:
+            raise ValueError(f"Unknown ADI image format {self.format!r}, expected one of {', '.join(self.FORMATS)}")
+        if not 100 <= self.size <= 2000:
+            raise ValueError(f"ADI image size must be 100-2000 px, got {self.size}")
+        if not 2 <= self.colors <= 256:
+            raise ValueError(f"ADI image colors must be 2-256, got {self.colors}")
+        if not 0 <= self.quality <= 100:
+            raise ValueError(f"ADI image quality must be 0-100, got {self.quality}")
+
+    @property
+    def dpi(self) -> float:
+        return self.size / self.FIGURE_INCHES
+
+    @classmethod
+    def from_env(cls) -> "AdiImageProfile":
+        """Build profile from ADI_IMAGE_* env variables"""
+        return cls(
+            format=os.getenv("ADI_IMAGE_FORMAT", "png"),
+            size=int(os.getenv("ADI_IMAGE_SIZE", "600")),
+            colors=int(os.getenv("ADI_IMAGE_COLORS", "64")),
+            quality=int(os.getenv("ADI_IMAGE_QUALITY", "80")),
+        )
+
+
 class ScanEntity:
     """Entity class representing a product scan."""
     def __init__(self, scan: dict):
         self._data = scan
+        self._adi_image: Optional[bytes] = None
 
     @property
     def id(self) -> Optional[str]:
@@ -90,8 +144,73 @@ class ScanEntity:
 
         return buttons
     
+    def get_adi_image(self, profile: AdiImageProfile) -> bytes:
+        """
+        Return ADI image, rendered once per entity.
+        Every chat waiting for the same scan gets the same completed entity, so the gauge is rendered only once.
+        """
+        if self._adi_image is None:
+            self._adi_image = self.get_adi_image_buffer(self, profile)
+        return self._adi_image
+
+    @staticmethod
+    def get_adi_image_buffer(scan_entity: "ScanEntity", profile: AdiImageProfile) -> bytes:
+        """
+        Generate an ADI image encoded according to profile.
+        Returns:
+            bytes: Image data in memory.
+        """
+        image, stats = ScanEntity.render_adi_image(scan_entity, profile)
+        logger.info(
+            f"ADI image {stats['format']} {stats['width']}x{stats['height']}: {stats['bytes']} bytes, "
+            f"render {stats['render_ms']}ms, encode {stats['encode_ms']}ms"
+        )
+        return image
+
     @staticmethod
-    def get_adi_image_buffer(scan_entity: "ScanEntity") -> bytes:
+    def render_adi_image(scan_entity: "ScanEntity", profile: AdiImageProfile) -> tuple[bytes, dict]:
+        """
+        Render ADI image and encode it according to profile.
+        Returns:
+            tuple[bytes, dict]: Image data and stats (format, size in pixels and bytes, render/encode time).
+        """
+        started = time.perf_counter()
+        png = ScanEntity._render_adi_png(scan_entity, profile.dpi)
+        rendered = time.perf_counter()
+        image, (width, height) = ScanEntity._encode_adi_image(png, profile)
+        encoded = time.perf_counter()
+
+        return image, {
+            "format": profile.format,
+            "width": width,
+            "height": height,
+            "bytes": len(image),
+            "render_ms": round((rendered - started) * 1000, 1),
+            "encode_ms": round((encoded - rendered) * 1000, 1),
+        }
+
+    @staticmethod
+    def _encode_adi_image(png: bytes, profile: AdiImageProfile) -> tuple[bytes, tuple[int, int]]:
+        """Re-encode rendered RGB PNG into the profile format"""
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(png))
+        if profile.format == "png":
+            return png, image.size
+
+        buffer = io.BytesIO()
+        if profile.format == "png8":
+            # Gauge is a few flat colours plus anti-aliasing, a small palette is enough
+            image.convert("RGB").quantize(colors=profile.colors).save(buffer, format="PNG", optimize=True)
+        elif profile.format == "webp":
+            image.convert("RGB").save(buffer, format="WEBP", quality=profile.quality, method=4)
+        else:
+            raise ValueError(f"Unknown ADI image format: {profile.format}")
+
+        return buffer.getvalue(), image.size
+
+    @staticmethod
+    def _render_adi_png(scan_entity: "ScanEntity", output_dpi: float) -> bytes:
         """
         Generate an ADI image similar to the provided sample: thick arc, rounded ends, gradient background, big number, label, rounded square.
         Returns:
@@ -116,61 +235,66 @@ class ScanEntity:
         size = 600
         dpi = 120
         fig, ax = plt.subplots(figsize=(size/dpi, size/dpi), dpi=dpi)
-        ax.set_xlim(0, 1)
-        ax.set_ylim(0, 1)
-        ax.axis('off')
-
-        # Draw rounded rectangle background (white)
-        rect = FancyBboxPatch((0, 0), 1, 1,
-                              boxstyle="round,pad=0.04,rounding_size=0.15",
-                              linewidth=0, facecolor="#fcfcfc")
-        ax.add_patch(rect)
-
-        # Arc parameters - empty side down, fills from left to right, rotated left by ~45 degrees
-        center = (0.5, 0.5)
-        radius = 0.38
-        width = 0.073  # Reduced thickness (was 0.13)
-        rotation = -45  # degrees, rotate the whole scale counter-clockwise (left by 90°)
-        total_span = 270  # degrees of the visible arc
-
-        # Background arc angles (rotated)
-        theta1_bg = 0 + rotation
-        theta2_bg = total_span + rotation
-
-        # Foreground (filled) angles: fill from left to right so foreground spans from
-        # the left edge towards the bottom (towards theta2_bg). Compute the left bound
-        # based on adi percent.
-        theta2_fg = theta2_bg
-        theta1_fg = theta2_bg - total_span * (adi / 100)
-
-        # Draw background arc (gray)
-        arc_bg = Arc(center, 2 * radius, 2 * radius, angle=0, theta1=theta1_bg, theta2=theta2_bg,
-                     lw=size * width, color="#ececec", capstyle='round')
-        ax.add_patch(arc_bg)
-
-        # Draw value arc (colored)
-        if adi > 0:
-            arc_fg = Arc(center, 2 * radius, 2 * radius, angle=0, theta1=theta1_fg, theta2=theta2_fg,
-                         lw=size * width, color=color, capstyle='round')
-            ax.add_patch(arc_fg)
-
-        # Draw number
-        ax.text(0.5, 0.47, str(adi), ha="center", va="center", fontsize=72, weight="700",
-                color="#1c1c28")
-
-        # Draw label
-        ax.text(0.5, 0.08, "Вредность", ha="center", va="center", fontsize=36, weight="bold",
-                color="#1c1c28")
-
-        # Remove axes
-        ax.set_xticks([])
-        ax.set_yticks([])
-
-        # Save to buffer
-        buffer = io.BytesIO()
-        plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
-        fig.savefig(buffer, format="png", bbox_inches="tight", pad_inches=0, transparent=False)
-        plt.close(fig)
+
+        # Always release the figure, pyplot keeps a reference to it until closed
+        try:
+            ax.set_xlim(0, 1)
+            ax.set_ylim(0, 1)
+            ax.axis('off')
+
+            # Draw rounded rectangle background (white)
+            rect = FancyBboxPatch((0, 0), 1, 1,
+                                  boxstyle="round,pad=0.04,rounding_size=0.15",
+                                  linewidth=0, facecolor="#fcfcfc")
+            ax.add_patch(rect)
+
+            # Arc parameters - empty side down, fills from left to right, rotated left by ~45 degrees
+            center = (0.5, 0.5)
+            radius = 0.38
+            width = 0.073  # Reduced thickness (was 0.13)
+            rotation = -45  # degrees, rotate the whole scale counter-clockwise (left by 90°)
+            total_span = 270  # degrees of the visible arc
+
+            # Background arc angles (rotated)
+            theta1_bg = 0 + rotation
+            theta2_bg = total_span + rotation
+
+            # Foreground (filled) angles: fill from left to right so foreground spans from
+            # the left edge towards the bottom (towards theta2_bg). Compute the left bound
+            # based on adi percent.
+            theta2_fg = theta2_bg
+            theta1_fg = theta2_bg - total_span * (adi / 100)
+
+            # Draw background arc (gray)
+            arc_bg = Arc(center, 2 * radius, 2 * radius, angle=0, theta1=theta1_bg, theta2=theta2_bg,
+                         lw=size * width, color="#ececec", capstyle='round')
+            ax.add_patch(arc_bg)
+
+            # Draw value arc (colored)
+            if adi > 0:
+                arc_fg = Arc(center, 2 * radius, 2 * radius, angle=0, theta1=theta1_fg, theta2=theta2_fg,
+                             lw=size * width, color=color, capstyle='round')
+                ax.add_patch(arc_fg)
+
+            # Draw number
+            ax.text(0.5, 0.47, str(adi), ha="center", va="center", fontsize=72, weight="700",
+                    color="#1c1c28")
+
+            # Draw label
+            ax.text(0.5, 0.08, "Вредность", ha="center", va="center", fontsize=36, weight="bold",
+                    color="#1c1c28")
+
+            # Remove axes
+            ax.set_xticks([])
+            ax.set_yticks([])
+
+            # Save to buffer
+            buffer = io.BytesIO()
+            plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
+            fig.savefig(buffer, format="png", dpi=output_dpi, bbox_inches="tight", pad_inches=0, transparent=False)
+        finally:
+            plt.close(fig)
+
         buffer.seek(0)
         return buffer.getvalue()
 
@@ -192,13 +316,23 @@ if __name__ == '__main__':
         }
     }
     
-    # Create ScanEntity and generate image
+    # Create ScanEntity and generate image in every format
     entity = ScanEntity(test_scan)
-    image_buffer = ScanEntity.get_adi_image_buffer(entity)
-    
-    # Save to file
-    output_path = test_dir / "adi_test_52.png"
-    with open(output_path, "wb") as f:
-        f.write(image_buffer)
-    
-    print(f"Image saved to: {output_path}")
+    profiles = [
+        AdiImageProfile("png"),
+        AdiImageProfile("png8"),
+        AdiImageProfile("png8", size=360, colors=32),
+        AdiImageProfile("webp"),
+        AdiImageProfile("webp", size=360),
+    ]
+
+    for profile in profiles:
+        image_buffer, stats = ScanEntity.render_adi_image(entity, profile)
+
+        # Save to file
+        extension = "webp" if profile.format == "webp" else "png"
+        output_path = test_dir / f"adi_test_52_{profile.format}_{profile.size}.{extension}"
+        with open(output_path, "wb") as f:
+            f.write(image_buffer)
+
+        print(f"{output_path.name}: {stats}")
@@ -1,11 +1,21 @@
 import asyncio
 import logging
 import os
+import signal
+import sys
+import time
+from multiprocessing.connection import Connection
+from typing import Optional
 
 from dotenv import load_dotenv
 from maxapi import Bot, Dispatcher
 
 from bot import register_all_handlers
+from bot.handlers.scanner import resume_scans
+from bot.services import memory_monitor, scan_tracker, scan_journal, pomelo_service, composition_filter
+from bot.supervisor import Supervisor, dispatch_updates
+from services.admin_server import AdminServer
+from services.loop_monitor import LoopMonitor
 
 # Load environment variables
 load_dotenv()
@@ -26,14 +36,143 @@ def create_dispatcher() -> Dispatcher:
     return dp
 
 
-async def main() -> None:
-    """Start bot polling"""
+def create_loop_monitor() -> LoopMonitor:
+    """Create event loop lag monitor"""
+    return LoopMonitor(
+        threshold=float(os.getenv('LOOP_LAG_THRESHOLD_MS', '250')) / 1000,
+        report_interval=float(os.getenv('LOOP_LAG_REPORT_INTERVAL', '60')),
+    )
+
+
+async def wait_active_scans(timeout: float) -> None:
+    """Wait until all tracked scans are finished or timeout expires"""
+    deadline = time.monotonic() + timeout
+    while scan_tracker.active_scans and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+
+    if scan_tracker.active_scans:
+        logging.warning(f"Stopping with {len(scan_tracker.active_scans)} unfinished scans")
+
+
+def create_admin_server(port_offset: int = 0) -> Optional[AdminServer]:
+    """Create admin server if ADMIN_PORT is set, workers listen on the following ports"""
+    port = os.getenv('ADMIN_PORT')
+    if not port:
+        return None
+
+    return AdminServer(
+        os.getenv('ADMIN_HOST', '127.0.0.1'),
+        int(port) + port_offset,
+        token=os.getenv('ADMIN_TOKEN') or None,
+        poll_stall_timeout=float(os.getenv('ADMIN_POLL_STALL_TIMEOUT', '90'))
+    )
+
+
+def add_scan_checks(admin: AdminServer, loop_monitor: LoopMonitor) -> None:
+    """Expose scan tracker, upstream and monitor state on admin server"""
+    admin.scan_tracker = scan_tracker
+    admin.add_check('upstream', lambda: (not pomelo_service.breaker.is_open, {'breaker': pomelo_service.breaker.state}))
+    admin.add_check('memory', lambda: (not memory_monitor.shedding, {'rss_mb': round(memory_monitor.rss_mb(), 1)}))
+    admin.add_stats('upstream', lambda: {
+        'breaker': pomelo_service.breaker.state,
+        'in_flight_requests': pomelo_service.in_flight,
+        'sse_streams': len(pomelo_service._active_subscriptions),
+    })
+    admin.add_stats('scans', lambda: {
+        'active_users': len(scan_tracker.active_scans),
+        'flights': len(scan_tracker.flights),
+        'journaled': len(scan_journal.entries),
+    })
+    admin.add_stats('loop_lag', loop_monitor.stats)
+    admin.add_stats('memory', memory_monitor.stats)
+    admin.add_stats('composition_filter', composition_filter.stats)
+
+
+def get_journal_path(worker_index: Optional[int]) -> str:
+    """Return scan journal path, every worker keeps its own journal"""
+    path = os.getenv('SCAN_JOURNAL', 'data/scan_journal.jsonl')
+    if worker_index is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-w{worker_index}{ext}"
+
+
+async def main(updates: Optional[Connection] = None, worker_index: Optional[int] = None) -> None:
+    """Start bot polling, or handle updates from supervisor pipe in worker mode"""
     bot = create_bot()
     dp = create_dispatcher()
 
+    # Pick up scans interrupted by the previous run, without delaying polling
+    resume_task = asyncio.create_task(resume_scans(bot, scan_journal.open(get_journal_path(worker_index))))
+
+    loop_monitor = create_loop_monitor()
+    loop_monitor.start()
+    memory_monitor.start()
+
+    admin = create_admin_server(0 if worker_index is None else worker_index + 1)
+    if admin:
+        add_scan_checks(admin, loop_monitor)
+        if updates is None:
+            admin.watch_polling(bot)
+        await admin.start()
+
     logging.info("Bot is starting...")
-    await dp.start_polling(bot)
+    try:
+        if updates is None:
+            await dp.start_polling(bot)
+        else:
+            await dispatch_updates(dp, bot, updates)
+            await wait_active_scans(float(os.getenv('BOT_DRAIN_TIMEOUT', '60')))
+    finally:
+        if admin:
+            await admin.stop()
+        resume_task.cancel()
+        memory_monitor.stop()
+        loop_monitor.stop()
+        scan_journal.close()
+        await bot.close_session()
+
+
+def worker_main(index: int, updates: Connection) -> None:
+    """Worker process entry point"""
+    # Supervisor handles Ctrl+C and tells workers to drain
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(levelname)s:worker-{index}:%(name)s:%(message)s",
+        force=True
+    )
+    run(main(updates, index))
+
+
+def run(coro) -> None:
+    """Run coroutine on the event loop selected by EVENT_LOOP env variable (asyncio or uvloop)"""
+    if os.getenv('EVENT_LOOP', 'asyncio') == 'uvloop':
+        try:
+            import uvloop
+        except ImportError:
+            logging.warning("EVENT_LOOP=uvloop but uvloop is not installed, falling back to asyncio")
+        else:
+            logging.info("Using uvloop event loop")
+            uvloop.run(coro)
+            return
+
+    asyncio.run(coro)
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    workers = int(os.getenv('BOT_WORKERS', '1'))
+
+    if workers > 1:
+        supervisor = Supervisor(
+            workers,
+            create_bot,
+            worker_main,
+            drain_timeout=float(os.getenv('BOT_DRAIN_TIMEOUT', '60')) + 10,
+            admin=create_admin_server()
+        )
+        run(supervisor.run())
+        if supervisor.failed:
+            sys.exit(1)
+    else:
+        run(main())
@@ -0,0 +1,185 @@
+"""
+Admin HTTP Server
+
+This module contains the AdminServer class responsible for the embedded operations endpoint:
+- Liveness and readiness probes for the orchestrator
+- Live JSON view of in-flight scans and process internals
+- Force-cancelling stuck scans
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from aiohttp import web
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressProbe:
+    """Remembers when some loop (e.g. polling) last made progress"""
+
+    def __init__(self):
+        self.last_progress = time.monotonic()
+
+    def touch(self) -> None:
+        """Mark progress"""
+        self.last_progress = time.monotonic()
+
+    def age(self) -> float:
+        """Seconds since last progress"""
+        return time.monotonic() - self.last_progress
+
+
+def get_executor_stats() -> dict:
+    """Return utilisation of the loop's default thread pool"""
+    executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    if executor is None:
+        return {"threads": 0}
+
+    return {
+        "max_workers": executor._max_workers,
+        "threads": len(executor._threads),
+        "queued": executor._work_queue.qsize(),
+    }
+
+
+class AdminServer:
+    """Small aiohttp server exposing health, readiness and live introspection"""
+
+    def __init__(self, host: str, port: int, token: Optional[str] = None, poll_stall_timeout: float = 90.0):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind
+            token: Bearer token required for mutating endpoints, None disables them
+            poll_stall_timeout: Not ready if long polling has not returned for this long (seconds)
+        """
+        self.host = host
+        self.port = port
+        self.token = token
+        self.poll_stall_timeout = poll_stall_timeout
+        self.scan_tracker = None
+
+        self._checks: dict[str, Callable[[], tuple[bool, object]]] = {}
+        self._stats: dict[str, Callable[[], object]] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_get("/healthz", self._healthz)
+        self.app.router.add_get("/readyz", self._readyz)
+        self.app.router.add_get("/stats", self._stats_view)
+        self.app.router.add_get("/scans", self._scans)
+        self.app.router.add_post("/scans/{scan_id}/cancel", self._cancel_scan)
+
+    def add_check(self, name: str, func: Callable[[], tuple[bool, object]]) -> None:
+        """Register readiness check returning (ok, details)"""
+        self._checks[name] = func
+
+    def add_stats(self, name: str, func: Callable[[], object]) -> None:
+        """Register a section of the /stats view"""
+        self._stats[name] = func
+
+    def watch_polling(self, bot) -> None:
+        """Add readiness check that bot's long polling keeps returning"""
+        probe = ProgressProbe()
+        get_updates = bot.get_updates
+
+        async def get_updates_with_probe(*args, **kwargs):
+            result = await get_updates(*args, **kwargs)
+            probe.touch()
+            return result
+
+        bot.get_updates = get_updates_with_probe
+        self.add_check('polling', lambda: (
+            probe.age() < self.poll_stall_timeout,
+            {'last_poll_s': round(probe.age(), 1)}
+        ))
+
+    async def start(self) -> None:
+        """Start serving"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Admin server listening on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Stop serving"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _healthz(self, request: web.Request) -> web.Response:
+        """Liveness: the event loop is able to answer"""
+        return web.json_response({"status": "ok"})
+
+    async def _readyz(self, request: web.Request) -> web.Response:
+        """Readiness: every registered check passes"""
+        checks = {}
+        ready = True
+
+        for name, func in self._checks.items():
+            try:
+                ok, details = func()
+            except Exception as e:
+                ok, details = False, str(e)
+            checks[name] = {"ok": ok, "details": details}
+            ready = ready and ok
+
+        return web.json_response(
+            {"status": "ready" if ready else "not_ready", "checks": checks},
+            status=200 if ready else 503
+        )
+
+    async def _stats_view(self, request: web.Request) -> web.Response:
+        """Process internals: streams, pools, queues, monitors"""
+        stats = {
+            "tasks": len(asyncio.all_tasks()),
+            "executor": get_executor_stats(),
+        }
+        for name, func in self._stats.items():
+            try:
+                stats[name] = func()
+            except Exception as e:
+                stats[name] = {"error": str(e)}
+
+        return web.json_response(stats)
+
+    async def _scans(self, request: web.Request) -> web.Response:
+        """Live view of in-flight scans"""
+        if self.scan_tracker is None:
+            raise web.HTTPNotFound(text="No scan tracker in this process")
+
+        now = time.time()
+        scans = [
+            {
+                "scan_id": flight.scan_id,
+                "key": flight.key[:24],
+                "status": flight.last_status,
+                "age_s": round(now - flight.started_at, 1),
+                "users": [listener.user_id for listener in flight.listeners],
+            }
+            for flight in self.scan_tracker.flights.values()
+        ]
+        scans.sort(key=lambda scan: scan["age_s"], reverse=True)
+
+        return web.json_response({
+            "active_users": len(self.scan_tracker.active_scans),
+            "scans": scans,
+        })
+
+    async def _cancel_scan(self, request: web.Request) -> web.Response:
+        """Force-cancel a stuck scan, its chats get an error message"""
+        if not self.token or request.headers.get("Authorization") != f"Bearer {self.token}":
+            raise web.HTTPUnauthorized(text="Admin token required")
+        if self.scan_tracker is None:
+            raise web.HTTPNotFound(text="No scan tracker in this process")
+
+        scan_id = request.match_info["scan_id"]
+        if not await self.scan_tracker.cancel_scan(scan_id, "сканирование прервано, попробуйте ещё раз"):
+            raise web.HTTPNotFound(text=f"Scan {scan_id} is not tracked")
+
+        logger.warning(f"Scan {scan_id} force-cancelled via admin endpoint")
+        return web.json_response({"cancelled": scan_id})
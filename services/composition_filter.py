@@ -0,0 +1,225 @@
+"""
+Composition Filter
+
+This module contains the CompositionFilter class responsible for the local pre-filter of text scans:
+- Normalising and trimming composition text
+- Rejecting commands, chatter and other non-composition text before it reaches the Pomelo API
+- Counting how many upstream scans were saved
+"""
+
+import logging
+import re
+from collections import Counter
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# E-numbers: E330, Е-330, e 471, E160a (Latin and Cyrillic "E")
+E_NUMBER_RE = re.compile(r"(?<![a-zа-яё])[eе][\s-]?\d{3,4}[a-z]?(?!\d)", re.IGNORECASE)
+
+# Header before the composition itself
+HEADER_RE = re.compile(r"^\s*(состав(\s+продукта)?|ингредиенты|ingredients)\s*[:\-—]?\s*", re.IGNORECASE)
+
+# Explicit label header ("Состав:"), a strong signal that a composition follows
+LABEL_HEADER_RE = re.compile(r"^\s*(состав(\s+продукта)?|ингредиенты|ingredients)\s*[:\-—]", re.IGNORECASE)
+
+# Label sections that usually follow the composition
+FOOTER_RE = re.compile(
+    r"(пищевая|энергетическая)\s+ценность|срок\s+годности|условия\s+хранения|хранить\s+при"
+    r"|изготовитель|производитель|nutrition\s+facts",
+    re.IGNORECASE
+)
+
+WORD_RE = re.compile(r"[a-zа-яё]+", re.IGNORECASE)
+
+# Stems of words typical for food compositions, matched as word prefixes.
+# Only stems long enough not to start everyday words (водитель, рисует, медленно, специально)
+INGREDIENT_STEMS = (
+    "сахар", "молок", "молоч", "масл", "крахмал", "ароматизатор", "консервант", "красител",
+    "эмульгатор", "стабилизатор", "загустител", "регулятор", "кислот", "лецитин", "сироп", "экстракт",
+    "белков", "жиров", "жирн", "какао", "пшенич", "ржан", "кукуруз", "соев", "яичн", "желатин",
+    "пектин", "дрожж", "сливк", "сливоч", "сыворот", "глюкоз", "фруктоз", "декстроз", "мальтодекстрин",
+    "подсластител", "антиокислител", "разрыхлител", "уксус", "лимонн", "аскорбин", "витамин", "фосфат",
+    "сорбат", "бензоат", "глутамат", "усилител", "концентрат", "пюре", "орех", "арахис", "кунжут",
+    "горчиц", "пряност", "перец", "чеснок", "томат", "ванилин", "шоколад", "овсян", "солод", "камед",
+    "каррагинан", "ксантан", "кальци", "порошок", "йогурт", "закваск", "фермент", "свинин", "говядин",
+    "курин", "сырн", "мясн", "творог", "сметан", "изюм", "ingredient", "sugar", "flour", "starch",
+    "acid", "flavour", "flavor", "emulsifier", "lecithin", "syrup", "extract", "protein", "cocoa", "wheat",
+)
+
+# Short ingredient words, matched only as whole words
+INGREDIENT_WORDS = frozenset((
+    "вода", "воды", "воду", "водой", "соль", "соли", "солью", "мука", "муки", "муку", "мукой",
+    "белок", "белки", "белков", "жир", "жиры", "жира", "соя", "сои", "яйца", "яиц", "яйцо", "яйцом",
+    "сок", "сока", "соки", "соков", "специи", "специй", "перца", "мед", "меда", "мёд", "мёда",
+    "рис", "риса", "рисовая", "рисовый", "рисовой", "рисовое", "агар", "натрий", "натрия",
+    "калий", "калия", "сухое", "сухой", "сухая", "сухого", "сухие", "сыр", "сыра", "сыры",
+    "мясо", "мяса", "water", "salt", "milk", "oil", "oils", "rice", "egg", "eggs",
+))
+
+# Conversational words that never appear in a food label
+CHATTER_WORDS = frozenset((
+    "я", "мне", "меня", "мой", "моя", "ты", "тебя", "тебе", "твой", "вы", "вас", "вам", "ваш", "мы", "нас",
+    "нам", "нужно", "надо", "хочу", "можно", "купить", "купи", "скажи", "подскажи", "помоги", "что",
+    "где", "почему", "зачем", "сколько", "привет", "здравствуйте", "спасибо", "пожалуйста",
+))
+
+
+def is_ingredient_word(word: str) -> bool:
+    """Whether lowercase word looks like a food ingredient"""
+    return word in INGREDIENT_WORDS or word.startswith(INGREDIENT_STEMS)
+
+
+class FilterResult:
+    """Result of the pre-filter check"""
+
+    def __init__(self, accepted: bool, text: str, reason: Optional[str] = None):
+        self.accepted = accepted
+        self.text = text
+        self.reason = reason
+
+
+class CompositionFilter:
+    """Cheap local classifier deciding whether text looks like a food composition"""
+
+    # Rejection reasons
+    COMMAND = "command"
+    TOO_SHORT = "too_short"
+    NOT_COMPOSITION = "not_composition"
+
+    def __init__(
+        self,
+        min_length: int = 15,
+        max_length: int = 3000,
+        min_density: float = 0.25
+    ):
+        """
+        Args:
+            min_length: Shorter texts are never compositions
+            max_length: Longer texts are trimmed to this length
+            min_density: Minimal share of ingredient words among all words
+        """
+        self.min_length = min_length
+        self.max_length = max_length
+        self.min_density = min_density
+        self.counters = Counter()
+
+    @staticmethod
+    def normalize(text: str, max_length: int) -> str:
+        """Drop header and trailing label sections, collapse whitespace and trim to max_length"""
+        text = HEADER_RE.sub("", text.strip())
+
+        footer = FOOTER_RE.search(text)
+        if footer and footer.start() > 0:
+            text = text[:footer.start()]
+
+        text = re.sub(r"\s+", " ", text).strip(" .;,")
+
+        # Cut on the last separator so no ingredient is cut in half
+        if len(text) > max_length:
+            cut = text[:max_length]
+            separator = max(cut.rfind(","), cut.rfind(";"))
+            text = cut[:separator] if separator > max_length // 2 else cut
+
+        return text
+
+    def check(self, text: str) -> FilterResult:
+        """Classify text and return normalised composition if it should be scanned"""
+        self.counters["checked"] += 1
+        result = self._classify(text)
+
+        if result.accepted:
+            self.counters["accepted"] += 1
+        else:
+            self.counters[f"rejected_{result.reason}"] += 1
+            logger.info(f"Pre-filter rejected text ({result.reason}), upstream scans saved: {self.saved}")
+
+        return result
+
+    @property
+    def saved(self) -> int:
+        """Number of upstream scans the filter prevented"""
+        return self.counters["checked"] - self.counters["accepted"]
+
+    def stats(self) -> dict:
+        """Return filter counters"""
+        return {**self.counters, "saved": self.saved}
+
+    def _classify(self, text: str) -> FilterResult:
+        if text.lstrip().startswith("/"):
+            return FilterResult(False, text, self.COMMAND)
+
+        normalized = self.normalize(text, self.max_length)
+
+        # Any E-number is a strong signal, even alone
+        if E_NUMBER_RE.search(normalized):
+            return FilterResult(True, normalized)
+
+        words = [word.lower() for word in WORD_RE.findall(normalized)]
+        hits = sum(1 for word in words if is_ingredient_word(word))
+        separators = normalized.count(",") + normalized.count(";")
+
+        # Text copied from a label: accept even single-ingredient products ("Состав: пюре яблочное")
+        if LABEL_HEADER_RE.match(text) and words and not CHATTER_WORDS.intersection(words):
+            return FilterResult(True, normalized)
+
+        if len(normalized) < self.min_length:
+            # Short list is fine when it consists of ingredients only ("Вода, соль")
+            if separators and len(words) >= 2 and hits == len(words):
+                return FilterResult(True, normalized)
+            return FilterResult(False, normalized, self.TOO_SHORT)
+
+        if CHATTER_WORDS.intersection(words):
+            return FilterResult(False, normalized, self.NOT_COMPOSITION)
+
+        # Share of list items (split by separators) naming an ingredient
+        items = [WORD_RE.findall(item.lower()) for item in re.split(r"[,;]", normalized)]
+        items = [item for item in items if item]
+        ingredient_items = sum(1 for item in items if any(is_ingredient_word(word) for word in item))
+        density = hits / len(words) if words else 0
+
+        if hits >= 2 and (density >= self.min_density or (len(items) >= 3 and ingredient_items * 2 >= len(items))):
+            return FilterResult(True, normalized)
+
+        return FilterResult(False, normalized, self.NOT_COMPOSITION)
+
+
+if __name__ == '__main__':
+    import sys
+
+    # Regression examples: (text, accepted)
+    examples = [
+        ("Вода, соль", True),
+        ("Е330", True),
+        ("сахар вода соль лимонная кислота", True),
+        ("Молоко нормализованное, закваска йогуртовая, сахар, стабилизатор пектин", True),
+        ("Мясо говядины, соль, перец черный молотый, чеснок", True),
+        ("Состав: свёкла, картофель, морковь, капуста, лук, фасоль", True),
+        ("Состав: крупа гречневая ядрица", True),
+        ("Состав: кофе натуральный жареный молотый", True),
+        ("Состав: филе минтая, панировочные сухари, лук", True),
+        ("Ингредиенты: огурцы, укроп, чеснок, лавровый лист", True),
+        ("Состав: пюре яблочное", True),
+        ("Вода", False),
+        ("/start", False),
+        ("Состав:", False),
+        ("Состав: что это?", False),
+        ("Специально для тебя, водитель рисует, сыр", False),
+        ("Мне нужно купить сок, рис и мясо", False),
+        ("Вчера ели сыр и мясо на обед у бабушки", False),
+        ("водка, водитель", False),
+        ("Привет! Как дела?", False),
+    ]
+
+    composition_filter = CompositionFilter()
+    failed = 0
+    for text, expected in examples:
+        result = composition_filter.check(text)
+        if result.accepted != expected:
+            failed += 1
+            print(f"FAIL {text!r}: accepted={result.accepted}, reason={result.reason}")
+
+    print(f"{len(examples) - failed}/{len(examples)} examples passed")
+    sys.exit(1 if failed else 0)
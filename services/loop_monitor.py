@@ -0,0 +1,130 @@
+"""
+Event Loop Monitor
+
+This module contains the LoopMonitor class responsible for watching the asyncio loop health:
+- Measuring loop lag continuously with a probe task
+- Detecting callbacks that block the loop and capturing their stack
+- Exporting lag percentiles
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Measures event loop lag and reports blocking calls"""
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: float = 0.25,
+        window: int = 3000,
+        report_interval: float = 60.0
+    ):
+        """
+        Args:
+            interval: How often the probe task wakes up (seconds)
+            threshold: Loop stall that is reported as a blocking call (seconds)
+            window: Number of lag samples kept for percentiles
+            report_interval: How often lag percentiles are logged (seconds), 0 disables
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.samples = deque(maxlen=window)
+        self.blocking_calls = 0
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._tasks: list[asyncio.Task] = []
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop"""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+
+        self._tasks.append(asyncio.create_task(self._probe()))
+        if self.report_interval > 0:
+            self._tasks.append(asyncio.create_task(self._report()))
+
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Loop monitor started (threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self) -> None:
+        """Stop monitoring"""
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        """Return lag percentiles in milliseconds"""
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0, "blocking_calls": self.blocking_calls}
+
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 2)
+
+        return {
+            "samples": len(samples),
+            "p50_ms": percentile(0.50),
+            "p90_ms": percentile(0.90),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(samples[-1] * 1000, 2),
+            "blocking_calls": self.blocking_calls,
+        }
+
+    async def _probe(self) -> None:
+        """Sleep for a fixed interval and record how late the loop woke us up"""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - started - self.interval
+            self.samples.append(max(lag, 0.0))
+            self._heartbeat = time.monotonic()
+
+    async def _report(self) -> None:
+        """Periodically log lag percentiles"""
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logger.info(f"Event loop lag: {self.stats()}")
+
+    def _watch(self) -> None:
+        """
+        Watchdog thread: if the probe has not ticked for longer than the
+        threshold, the loop is blocked - capture what the loop thread is doing.
+        """
+        reported_heartbeat = None
+
+        while not self._stop.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+
+            if stalled_for < self.threshold or heartbeat == reported_heartbeat:
+                continue
+
+            # Report every stall only once
+            reported_heartbeat = heartbeat
+            self.blocking_calls += 1
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<stack unavailable>"
+            logger.warning(
+                f"Event loop blocked for more than {stalled_for * 1000:.0f}ms, "
+                f"loop thread stack:\n{stack}"
+            )
@@ -0,0 +1,147 @@
+"""
+Memory Monitor
+
+This module contains the MemoryMonitor class responsible for memory accounting of the bot process:
+- Tracking RSS and shedding load when it crosses a soft limit
+- Counting live objects (scans, subscriptions, figures) via registered gauges
+- Diffing periodic tracemalloc snapshots to spot growing allocation sites
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import resource
+import sys
+import tracemalloc
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryMonitor:
+    """Periodically samples process memory and flags leaks and overload"""
+
+    def __init__(
+        self,
+        interval: float = 60.0,
+        soft_limit_mb: float = 0,
+        tracemalloc_frames: int = 0,
+        top: int = 10
+    ):
+        """
+        Args:
+            interval: How often memory is sampled (seconds)
+            soft_limit_mb: RSS above which new work is shed, 0 disables shedding
+            tracemalloc_frames: Traceback depth for tracemalloc, 0 disables snapshots
+            top: Number of allocation sites logged from every snapshot diff
+        """
+        self.interval = interval
+        self.soft_limit_mb = soft_limit_mb
+        self.tracemalloc_frames = tracemalloc_frames
+        self.top = top
+        self.shedding = False
+
+        self._gauges: dict[str, Callable[[], int]] = {}
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register_gauge(self, name: str, func: Callable[[], int]) -> None:
+        """Register a counter of live objects to be reported with every sample"""
+        self._gauges[name] = func
+
+    def start(self) -> None:
+        """Start periodic sampling on the running loop"""
+        if self.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Memory monitor started (soft limit {self.soft_limit_mb or 'off'} MB, "
+            f"tracemalloc {'on' if tracemalloc.is_tracing() else 'off'})"
+        )
+
+    def stop(self) -> None:
+        """Stop sampling"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def rss_mb() -> float:
+        """Return current resident set size in megabytes"""
+        try:
+            with open("/proc/self/statm") as statm:
+                resident_pages = int(statm.read().split()[1])
+            return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+        except (OSError, ValueError, IndexError):
+            # No procfs: fall back to peak RSS (KB on Linux, bytes on macOS)
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+    def stats(self) -> dict:
+        """Return current memory numbers and live object counts"""
+        stats = {
+            "rss_mb": round(self.rss_mb(), 1),
+            "soft_limit_mb": self.soft_limit_mb,
+            "shedding": self.shedding,
+        }
+
+        for name, func in self._gauges.items():
+            try:
+                stats[name] = func()
+            except Exception as e:
+                logger.error(f"Memory gauge '{name}' failed: {e}")
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            stats["traced_mb"] = round(current / 2 ** 20, 1)
+            stats["traced_peak_mb"] = round(peak / 2 ** 20, 1)
+
+        return stats
+
+    def check(self) -> dict:
+        """Sample memory once and update shedding state"""
+        stats = self.stats()
+        rss = stats["rss_mb"]
+
+        if self.soft_limit_mb:
+            if not self.shedding and rss > self.soft_limit_mb:
+                self.shedding = True
+                gc.collect()
+                logger.warning(f"RSS {rss} MB crossed soft limit {self.soft_limit_mb} MB, shedding new scans")
+            # Hysteresis: resume only well below the limit
+            elif self.shedding and rss < self.soft_limit_mb * 0.9:
+                self.shedding = False
+                logger.info(f"RSS {rss} MB back under soft limit, accepting new scans")
+
+        stats["shedding"] = self.shedding
+        logger.info(f"Memory: {stats}")
+        return stats
+
+    async def _run(self) -> None:
+        """Sampling loop"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.check()
+                if tracemalloc.is_tracing():
+                    await asyncio.to_thread(self._diff_snapshot)
+            except Exception as e:
+                logger.error(f"Memory sampling failed: {e}")
+
+    def _diff_snapshot(self) -> None:
+        """Take a tracemalloc snapshot and log the biggest growth since the previous one"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+        if self._snapshot is not None:
+            diff = snapshot.compare_to(self._snapshot, "lineno")[:self.top]
+            lines = "\n".join(f"  {stat}" for stat in diff if stat.size_diff > 0)
+            if lines:
+                logger.info(f"Top allocation growth since last snapshot:\n{lines}")
+
+        self._snapshot = snapshot
@@ -1,23 +1,77 @@
 import os
+import asyncio
+import logging
 import aiohttp
 import json
-import requests
-from sseclient import SSEClient
 from typing import Dict, Any, Optional, Callable, Awaitable
 from entities.scan_entity import ScanEntity
+from services.resilience import CircuitBreaker, CircuitOpenError, LatencyBudget, RetryPolicy, hedged
 import dotenv
 
 dotenv.load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class PomeloError(Exception):
+    """Base error for failed Pomelo API calls"""
+
+
+class PomeloAPIError(PomeloError):
+    """Upstream rejected the request (4xx), retrying will not help"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class PomeloTransientError(PomeloError):
+    """
+    Timeout, connection failure, 5xx or malformed response.
+
+    request_sent is False when the request never reached upstream,
+    so even non-idempotent requests may be retried safely.
+    """
+
+    def __init__(self, message: str, request_sent: bool = True, status: Optional[int] = None):
+        super().__init__(message)
+        self.request_sent = request_sent
+        self.status = status
+
+
+class PomeloUnavailableError(PomeloError):
+    """Circuit breaker is open, upstream is considered degraded"""
+
+
 class PomeloService:
     """
     Class for interacting with the Pomelo API for food scanning.
     """
 
+    # Per-endpoint latency budgets (seconds)
+    LATENCY_BUDGETS = {
+        'create_scan': LatencyBudget(total=40.0, attempt=20.0),
+        'get_scan': LatencyBudget(total=15.0, attempt=5.0, hedge_after=1.0),
+        'photo_download': LatencyBudget(total=20.0, attempt=15.0),
+        # total: connection established and headers received, stall: silence between events
+        'status_stream': LatencyBudget(total=10.0, attempt=10.0, stall=90.0),
+    }
+
+    # Statuses upstream uses to say "try again later"
+    RETRYABLE_STATUSES = (429, 502, 503, 504)
+
     def __init__(self):
         self.base_url = 'https://pomelo.colorbit.ru/api'
         self.token = os.getenv("POMELO_API_TOKEN")
         self._active_subscriptions = {}  # scan_id -> should_stop flag
+        self.in_flight = 0  # upstream requests currently in progress
+        self.retry_policy = RetryPolicy()
+        self.breaker = CircuitBreaker(
+            'pomelo',
+            failure_threshold=int(os.getenv("POMELO_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("POMELO_BREAKER_RESET", "30")),
+        )
+        self.hedging = os.getenv("POMELO_HEDGING", "1") == "1"
 
         if not self.token:
             raise ValueError("API token is required. Provide it in POMELO_API_TOKEN env variable.")
@@ -26,50 +80,153 @@ class PomeloService:
         self,
         method: str,
         endpoint: str,
+        operation: str,
         data: Optional[Any] = None,
         **kwargs
     ) -> Dict[str, Any]:
-        """Send API request with token"""
+        """
+        Send API request with token.
+
+        Retries transient failures with jittered backoff inside the operation's
+        latency budget. Non-idempotent methods are only retried when the request
+        never reached upstream or upstream explicitly asked to retry.
+        `data` may be a callable returning a fresh payload for every attempt.
+        """
+        budget = self.LATENCY_BUDGETS[operation]
+        idempotent = method in ('GET', 'HEAD', 'OPTIONS')
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget.total
+        attempt = 0
+
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError as e:
+                raise PomeloUnavailableError(str(e)) from e
+
+            timeout = min(budget.attempt, max(deadline - loop.time(), 0.1))
+
+            async def call() -> Dict[str, Any]:
+                return await self._attempt(method, endpoint, timeout, data, **kwargs)
+
+            try:
+                if idempotent and self.hedging and budget.hedge_after is not None:
+                    result = await hedged(call, budget.hedge_after)
+                else:
+                    result = await call()
+            except PomeloTransientError as e:
+                self.breaker.record_failure()
+
+                retryable = idempotent or not e.request_sent or e.status in self.RETRYABLE_STATUSES
+                delay = self.retry_policy.backoff(attempt)
+                attempt += 1
+
+                if (
+                    not retryable
+                    or attempt >= self.retry_policy.max_attempts
+                    or loop.time() + delay >= deadline
+                ):
+                    logger.warning(f"{operation} {method} {endpoint} failed after {attempt} attempt(s): {e}")
+                    raise
+
+                logger.info(f"{operation} attempt {attempt} failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            except PomeloAPIError:
+                # Upstream is alive, it just did not like the request
+                self.breaker.record_success()
+                raise
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return result
 
+    async def _attempt(
+        self,
+        method: str,
+        endpoint: str,
+        timeout: float,
+        data: Optional[Any] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Send a single request attempt and classify its outcome"""
         url = f'{self.base_url}{endpoint}'
-        headers = kwargs.pop('headers', {})
+        headers = dict(kwargs.pop('headers', {}))
         headers['Authorization'] = f'Bearer {self.token}'
+        payload = data() if callable(data) else data
+
+        self.in_flight += 1
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+                async with session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    data=payload,
+                    **kwargs
+                ) as resp:
+                    if resp.status >= 500 or resp.status in self.RETRYABLE_STATUSES:
+                        raise PomeloTransientError(f"HTTP {resp.status}", status=resp.status)
+                    if resp.status >= 400:
+                        raise PomeloAPIError(f"HTTP {resp.status}: {await resp.text()}", status=resp.status)
+
+                    try:
+                        result = await resp.json(content_type=None)
+                    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                        raise PomeloTransientError(f"Malformed response: {e}", status=resp.status)
+                    if not isinstance(result, dict):
+                        raise PomeloTransientError(
+                            f"Malformed response: expected JSON object, got {type(result).__name__}",
+                            status=resp.status
+                        )
+                    return result
+        except asyncio.TimeoutError:
+            raise PomeloTransientError(f"Timed out after {timeout:.1f}s")
+        except aiohttp.ClientConnectorError as e:
+            raise PomeloTransientError(f"Connection failed: {e}", request_sent=False)
+        except aiohttp.ClientError as e:
+            raise PomeloTransientError(f"Client error: {e}")
+        finally:
+            self.in_flight -= 1
+
+    async def downloadPhoto(self, photo_url: str) -> bytes:
+        """Download user photo by URL"""
+        budget = self.LATENCY_BUDGETS['photo_download']
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=budget.total)) as session:
+                async with session.get(photo_url) as img_resp:
+                    img_resp.raise_for_status()
+                    return await img_resp.read()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            raise PomeloError(f"Failed to download photo: {e}") from e
+
+    async def createPhotoScan(self, img_bytes: bytes) -> ScanEntity:
+        """Create a scan by photo contents"""
+        def form() -> aiohttp.FormData:
+            form = aiohttp.FormData()
+            form.add_field('photo', img_bytes, filename='image.jpg', content_type='image/jpeg')
+            form.add_field('type', 'food')
+            return form
 
-        async with aiohttp.ClientSession() as session:
-            async with session.request(
-                method,
-                url,
-                headers=headers,
-                data=data,
-                **kwargs
-            ) as resp:
-                return await resp.json()
-
-    async def createPhotoScan(self, photo_url: str) -> ScanEntity:
-        """Create a scan by photo URL"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(photo_url) as img_resp:
-                img_bytes = await img_resp.read()
-
-        form = aiohttp.FormData()
-        form.add_field('photo', img_bytes, filename='image.jpg', content_type='image/jpeg')
-        form.add_field('type', 'food')
-
-        result = await self._request('POST', '/scans', data=form)
+        result = await self._request('POST', '/scans', 'create_scan', data=form)
         return ScanEntity(result.get("scan", {}))
 
     async def createTextScan(self, composition_text: str) -> ScanEntity:
         """Create a scan by composition text"""
-        form = aiohttp.FormData()
-        form.add_field('composition', composition_text)
-        form.add_field('type', 'food')
+        def form() -> aiohttp.FormData:
+            form = aiohttp.FormData()
+            form.add_field('composition', composition_text)
+            form.add_field('type', 'food')
+            return form
 
-        result = await self._request('POST', '/scans', data=form)
+        result = await self._request('POST', '/scans', 'create_scan', data=form)
         return ScanEntity(result.get("scan", {}))
 
     async def getScanResult(self, scan_id: str) -> ScanEntity:
         """Get scan result by scan ID"""
-        result = await self._request('GET', f'/scans/{scan_id}')
+        result = await self._request('GET', f'/scans/{scan_id}', 'get_scan')
         return ScanEntity(result.get("scan", {}))
 
     async def subscribeScanStatusUpdate(
@@ -83,33 +240,78 @@ class PomeloService:
         """
         url = f"{self.base_url}/scans/{scan_id}/status-updates"
 
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError as e:
+            if on_error:
+                await on_error(str(e))
+            return
+
         # Mark this subscription as active
         self._active_subscriptions[scan_id] = False
+        budget = self.LATENCY_BUDGETS['status_stream']
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            connect=budget.total,
+            sock_connect=budget.attempt,
+            sock_read=budget.stall
+        )
+        headers = {'Authorization': f'Bearer {self.token}', 'Accept': 'text/event-stream'}
+        connected = False
 
         try:
-            with requests.get(url, stream=True) as response:
-                client = SSEClient(response)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(url, headers=headers) as response:
+                    if response.status >= 500 or response.status in self.RETRYABLE_STATUSES:
+                        self.breaker.record_failure()
+                        if on_error:
+                            await on_error(f"Connection error: HTTP {response.status}")
+                        return
 
-                for event in client.events():
-                    # Check if we should stop this subscription
-                    if self._active_subscriptions.get(scan_id, False):
-                        print(f"Unsubscribed from scan {scan_id}")
-                        break
+                    # Upstream is alive, it just does not know the scan (e.g. 404 for an expired scan ID)
+                    self.breaker.record_success()
+                    if response.status >= 400:
+                        if on_error:
+                            await on_error(f"HTTP {response.status}: {await response.text()}")
+                        return
 
-                    try:
-                        data = json.loads(event.data)
-                        status = data.get("status")
-                        print(f"SSE event: {status}")
+                    connected = True
 
-                        # Call the callback with status
-                        await on_status_update(status)
+                    async for data in self._read_sse_data(response):
+                        # Check if we should stop this subscription
+                        if self._active_subscriptions.get(scan_id, False):
+                            logger.info(f"Unsubscribed from scan {scan_id}")
+                            break
 
-                    except Exception as e:
-                        if on_error:
-                            await on_error(str(e))
-                        break
+                        try:
+                            status = json.loads(data).get("status")
+                            logger.info(f"SSE event for scan {scan_id}: {status}")
 
+                            # Call the callback with status
+                            await on_status_update(status)
+
+                        except Exception as e:
+                            if on_error:
+                                await on_error(str(e))
+                            break
+
+        except asyncio.TimeoutError:
+            # Stream stalled (or never connected): upstream is hanging
+            self.breaker.record_failure()
+            stage = "no status update" if connected else "no connection"
+            if on_error:
+                await on_error(f"Connection error: {stage} in {budget.stall if connected else budget.total:.0f}s")
+        except aiohttp.ClientError as e:
+            self.breaker.record_failure()
+            if on_error:
+                await on_error(f"Connection error: {e}")
+        except asyncio.CancelledError:
+            if not connected:
+                self.breaker.release()
+            raise
         except Exception as e:
+            if not connected:
+                self.breaker.release()
             if on_error:
                 await on_error(f"Connection error: {str(e)}")
         finally:
@@ -117,6 +319,23 @@ class PomeloService:
             if scan_id in self._active_subscriptions:
                 del self._active_subscriptions[scan_id]
 
+    @staticmethod
+    async def _read_sse_data(response: aiohttp.ClientResponse):
+        """Yield data of every server-sent event in response"""
+        data_lines = []
+        async for raw_line in response.content:
+            line = raw_line.decode('utf-8').rstrip('\r\n')
+
+            # Blank line dispatches the event
+            if not line:
+                if data_lines:
+                    yield '\n'.join(data_lines)
+                    data_lines = []
+                continue
+
+            if line.startswith('data:'):
+                data_lines.append(line[5:].removeprefix(' '))
+
     def unsubscribeFromStatusUpdates(self, scan_id: str) -> None:
         """
         Unsubscribe from scan status SSE updates.
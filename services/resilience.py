@@ -0,0 +1,167 @@
+"""
+Resilience primitives for upstream calls
+
+This module contains the building blocks used by PomeloService to survive
+upstream hiccups:
+- LatencyBudget: per-endpoint deadlines, hedging delay and stream stall timeout
+- RetryPolicy: jittered exponential backoff
+- CircuitBreaker: fast-fail when upstream is degraded
+- hedged(): race a second attempt against a slow first one
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class LatencyBudget:
+    """
+    Latency budget for a single endpoint.
+
+    Attributes:
+        total: Deadline for the whole call in seconds, retries included
+        attempt: Timeout for a single attempt in seconds
+        hedge_after: Delay before a hedged second attempt is fired (None disables hedging)
+        stall: Longest silence allowed between chunks of a streaming response (None for plain requests)
+    """
+    total: float
+    attempt: float
+    hedge_after: Optional[float] = None
+    stall: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Retry policy with "full jitter" exponential backoff.
+
+    Attributes:
+        max_attempts: Maximum number of attempts, the first one included
+        base_delay: Backoff base in seconds
+        max_delay: Upper bound for a single backoff in seconds
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.3
+    max_delay: float = 3.0
+
+    def backoff(self, attempt: int) -> float:
+        """Return jittered delay before the next attempt (attempt is 0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    -> calls pass, failures are counted
+    open      -> calls fail fast until reset_timeout elapses
+    half_open -> a single probe call is let through; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """True if calls are currently being rejected"""
+        if self.state == self.OPEN:
+            return time.monotonic() - self._opened_at < self.reset_timeout
+        return self.state == self.HALF_OPEN and self._probe_in_flight
+
+    def before_call(self) -> None:
+        """Check that a call may proceed, raise CircuitOpenError otherwise"""
+        if self.state == self.OPEN:
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed < self.reset_timeout:
+                raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit '{self.name}' half-open, probing upstream")
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        """Register a successful call"""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit '{self.name}' closed")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Register a failed call"""
+        self._failures += 1
+        self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"Circuit '{self.name}' opened after {self._failures} failures, "
+                    f"fast-failing for {self.reset_timeout:.0f}s"
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Release a half-open probe slot without judging upstream health"""
+        self._probe_in_flight = False
+
+
+async def hedged(call: Callable[[], Awaitable[T]], hedge_after: float) -> T:
+    """
+    Run call() and, if it has not finished after hedge_after seconds, fire a
+    second identical call. The first successful result wins, the loser is cancelled.
+    Only use for idempotent requests.
+    """
+    tasks = [asyncio.ensure_future(call())]
+
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            logger.debug(f"Hedging request after {hedge_after:.2f}s")
+            tasks.append(asyncio.ensure_future(call()))
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
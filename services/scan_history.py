@@ -0,0 +1,128 @@
+"""
+Scan History Service
+
+This module contains the ScanHistory class responsible for the local per-user scan history:
+- Persisting completed scans with their rendered ADI gauge in SQLite
+- Paging through a user's recent scans
+- Serving stored results without calling the Pomelo API
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from entities.scan_entity import ScanEntity
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    scan_id TEXT,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    adi INTEGER,
+    created_at REAL NOT NULL,
+    payload TEXT NOT NULL,
+    gauge BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_scans_user_time ON scans (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_scans_user_name ON scans (user_id, name_norm);
+CREATE INDEX IF NOT EXISTS idx_scans_time ON scans (created_at);
+"""
+
+
+class ScanHistory:
+    """SQLite-backed history of completed scans"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database lazily and make sure the schema exists"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            logger.info(f"Scan history opened at {self.path}")
+        return self._conn
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        """Normalise product name for lookups: lowercase, no punctuation, single spaces"""
+        name = name.lower().replace("ё", "е")
+        name = re.sub(r"[^\w\s]", " ", name)
+        return re.sub(r"\s+", " ", name).strip()
+
+    async def add(self, user_id: str, scan_entity: ScanEntity, gauge: Optional[bytes]) -> int:
+        """Store completed scan, returns history entry ID"""
+        return await asyncio.to_thread(self._add, user_id, scan_entity, gauge)
+
+    async def recent(self, user_id: str, limit: int, offset: int = 0) -> list[dict]:
+        """Return user's recent scans (newest first) without payloads"""
+        return await asyncio.to_thread(self._recent, user_id, limit, offset)
+
+    async def get(self, user_id: str, entry_id: int) -> Optional[tuple[ScanEntity, Optional[bytes]]]:
+        """Return stored scan and gauge image, None if entry does not belong to user"""
+        return await asyncio.to_thread(self._get, user_id, entry_id)
+
+    def _add(self, user_id: str, scan_entity: ScanEntity, gauge: Optional[bytes]) -> int:
+        data = scan_entity._data or {}
+        name = scan_entity.name
+        adi = data.get("analysis", {}).get("additivesDangerIndex")
+
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(
+                "INSERT INTO scans (user_id, scan_id, name, name_norm, adi, created_at, payload, gauge) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    user_id,
+                    scan_entity.id,
+                    name,
+                    self.normalize_name(name),
+                    adi,
+                    time.time(),
+                    json.dumps(data, ensure_ascii=False),
+                    gauge,
+                )
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+    def _recent(self, user_id: str, limit: int, offset: int) -> list[dict]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, name, adi, created_at FROM scans "
+                "WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (user_id, limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _get(self, user_id: str, entry_id: int) -> Optional[tuple[ScanEntity, Optional[bytes]]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT payload, gauge FROM scans WHERE id = ? AND user_id = ?",
+                (entry_id, user_id)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return ScanEntity(json.loads(row["payload"])), row["gauge"]
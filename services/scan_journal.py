@@ -0,0 +1,212 @@
+"""
+Scan Journal Service
+
+This module contains the ScanJournal class responsible for crash-safe bookkeeping of in-flight scans:
+- Appending scan start, progress and finish records to a write-ahead log
+- Replaying the log on boot to find scans interrupted by a restart
+- Compacting the log so it only holds unfinished scans
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class ScanJournal:
+    """
+    Append-only JSON lines journal of in-flight scans, keyed by user ID
+    (a user has at most one active scan).
+    """
+
+    def __init__(self, max_age: float = 3600.0, fsync: bool = False, compact_records: int = 1000):
+        """
+        Args:
+            max_age: Scans older than this (seconds) are not resumed
+            fsync: Fsync records in a background thread, survives host crashes at the cost of disk flushes
+            compact_records: Rewrite the journal once it holds this many records
+        """
+        self.max_age = max_age
+        self.fsync = fsync
+        self.compact_records = compact_records
+        self.path: Optional[str] = None
+        self.entries: dict[str, dict] = {}  # user_id -> in-flight scan
+        self._file = None
+        self._records = 0
+        self._fsync_pending = False
+        self._fsync_dirty = False
+
+    def open(self, path: str) -> list[dict]:
+        """
+        Replay journal, compact it and open it for appending.
+
+        Returns:
+            Unfinished scans to resume (scan_id, user_id, chat_id, msg_id, status, started_at)
+        """
+        self.path = path
+        self.entries = self._replay(path)
+
+        now = time.time()
+        for user_id, entry in list(self.entries.items()):
+            if now - entry["started_at"] > self.max_age:
+                logger.info(f"Dropping stale journaled scan {entry['scan_id']} of user {user_id}")
+                del self.entries[user_id]
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._compact()
+        logger.info(f"Scan journal opened at {path}, {len(self.entries)} scan(s) to resume")
+        return list(self.entries.values())
+
+    def close(self) -> None:
+        """Close journal file"""
+        if self._file:
+            if self.fsync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def start(self, user_id: str, scan_id: str, chat_id: int, msg_id: Optional[str], status: Optional[str]) -> None:
+        """Record scan start"""
+        entry = {
+            "user_id": user_id,
+            "scan_id": scan_id,
+            "chat_id": chat_id,
+            "msg_id": msg_id,
+            "status": status,
+            "started_at": time.time(),
+        }
+        self.entries[user_id] = entry
+        self._write({"op": "start", **entry})
+
+    def update(self, user_id: str, msg_id: Optional[str] = None, status: Optional[str] = None) -> None:
+        """Record progress message ID and/or last status of user's scan"""
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return
+
+        changes = {}
+        if msg_id is not None and msg_id != entry["msg_id"]:
+            changes["msg_id"] = msg_id
+        if status is not None and status != entry["status"]:
+            changes["status"] = status
+        if not changes:
+            return
+
+        entry.update(changes)
+        self._write({"op": "update", "user_id": user_id, **changes})
+
+    def finish(self, user_id: str, scan_id: Optional[str] = None) -> None:
+        """Record that user's scan is finished (completed or failed), only if it is scan_id when given"""
+        entry = self.entries.get(user_id)
+        if entry is None or (scan_id is not None and entry["scan_id"] != scan_id):
+            return
+
+        del self.entries[user_id]
+        self._write({"op": "finish", "user_id": user_id})
+
+    def _write(self, record: dict) -> None:
+        if self._file is None:
+            return
+
+        try:
+            if not self.entries:
+                # Nothing in flight: the whole journal is obsolete
+                self._file.truncate(0)
+                self._records = 0
+            elif self._records >= max(self.compact_records, 2 * len(self.entries)):
+                self._compact()
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._records += 1
+
+            self._file.flush()
+            if self.fsync:
+                self._schedule_fsync()
+        except OSError as e:
+            logger.error(f"Failed to write scan journal: {e}")
+
+    def _compact(self) -> None:
+        """Rewrite journal with unfinished scans only and reopen it for appending"""
+        if self._file:
+            self._file.close()
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as tmp:
+            for entry in self.entries.values():
+                tmp.write(json.dumps({"op": "start", **entry}, ensure_ascii=False) + "\n")
+            tmp.flush()
+            if self.fsync:
+                os.fsync(tmp.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._records = len(self.entries)
+
+    def _schedule_fsync(self) -> None:
+        """Fsync in the default executor, records written meanwhile are batched into the next fsync"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            os.fsync(self._file.fileno())
+            return
+
+        if self._fsync_pending:
+            self._fsync_dirty = True
+            return
+
+        # Fsync a duplicate descriptor: the file may be closed or swapped by compaction meanwhile
+        self._fsync_pending = True
+        loop.run_in_executor(None, self._fsync_fd, os.dup(self._file.fileno())).add_done_callback(self._fsync_done)
+
+    @staticmethod
+    def _fsync_fd(fd: int) -> None:
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _fsync_done(self, future: asyncio.Future) -> None:
+        self._fsync_pending = False
+        if future.exception() is not None:
+            logger.error(f"Failed to fsync scan journal: {future.exception()}")
+
+        if self._fsync_dirty and self._file is not None:
+            self._fsync_dirty = False
+            self._schedule_fsync()
+
+    @staticmethod
+    def _replay(path: str) -> dict[str, dict]:
+        """Rebuild in-flight scans from journal records"""
+        entries = {}
+        if not os.path.exists(path):
+            return entries
+
+        with open(path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write of the last record before a crash
+                    logger.warning(f"Skipping corrupted scan journal record: {line[:80]!r}")
+                    continue
+
+                op = record.pop("op", None)
+                user_id = record.get("user_id")
+
+                if op == "start":
+                    entries[user_id] = record
+                elif op == "update" and user_id in entries:
+                    entries[user_id].update(record)
+                elif op == "finish":
+                    entries.pop(user_id, None)
+
+        return entries
@@ -5,107 +5,263 @@ This module contains the ScanTracker class responsible for managing scan lifecyc
 - Subscribing to SSE updates
 - Processing status updates
 - Managing scan sessions
+- De-duplicating concurrent identical scans (single-flight)
 """
 
 import asyncio
+import hashlib
 import logging
-from typing import Callable, Awaitable
-from services.pomelo_service import PomeloService
+import re
+import time
+from typing import Callable, Awaitable, Optional
+from entities.scan_entity import ScanEntity
+from services.pomelo_service import PomeloService, PomeloAPIError
 
 
 logger = logging.getLogger(__name__)
 
 
+class ScanListener:
+    """Chat waiting for a scan result"""
+
+    def __init__(
+        self,
+        user_id: str,
+        on_status: Callable[[str, object], Awaitable[None]],
+        on_complete: Callable[[object], Awaitable[None]],
+        on_error: Callable[[str], Awaitable[None]]
+    ):
+        self.user_id = user_id
+        self.on_status = on_status
+        self.on_complete = on_complete
+        self.on_error = on_error
+
+
+class ScanFlight:
+    """One upstream scan shared by every listener that requested the same content"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.scan_id: Optional[str] = None
+        self.created: Optional[asyncio.Future] = None
+        self.listeners: list[ScanListener] = []
+        self.last_status: Optional[str] = None
+        self.started_at = time.time()
+        self.task: Optional[asyncio.Task] = None  # SSE subscription (or immediate finish) task
+
+
 class ScanTracker:
     """Manages scan lifecycle and status updates"""
 
+    FAILED_STATUSES = ("failed", "analysis_failed", "recognition_failed")
+    COMPLETED_STATUSES = ("completed", "ai_analysis_completed")
+
     def __init__(self, pomelo_service: PomeloService):
         self.pomelo_service = pomelo_service
         self.active_scans = []
+        self.flights: dict[str, ScanFlight] = {}  # dedup key -> in-flight scan
 
-    async def track_scan(
+    @staticmethod
+    def text_key(text: str) -> str:
+        """De-duplication key for a composition text"""
+        normalized = re.sub(r"\s+", " ", text.strip().lower().replace("ё", "е"))
+        return "text:" + hashlib.sha256(normalized.encode()).hexdigest()
+
+    @staticmethod
+    def photo_key(photo: bytes) -> str:
+        """De-duplication key for a photo"""
+        return "photo:" + hashlib.sha256(photo).hexdigest()
+
+    async def start_scan(
         self,
         user_id: str,
-        scan_id: str,
+        key: str,
+        create_scan: Callable[[], Awaitable[ScanEntity]],
         on_status: Callable[[str, object], Awaitable[None]],
         on_complete: Callable[[object], Awaitable[None]],
         on_error: Callable[[str], Awaitable[None]]
-    ) -> bool:
+    ) -> Optional[str]:
         """
-        Start tracking scan status updates
+        Start scan or attach to an identical one already running and track its status updates
 
         Args:
             user_id: User identifier
-            scan_id: Scan ID to track
+            key: De-duplication key, requests with the same key share one upstream scan
+            create_scan: Coroutine factory creating the upstream scan, called only if no scan with this key is running
             on_status: Callback for status updates (status, scan_entity)
             on_complete: Callback when scan is fully completed (scan_entity)
             on_error: Callback for errors (error_message)
 
         Returns:
-            True if tracking started, False if user already has active scan
+            Scan ID if tracking started, None if user already has active scan
+
+        Raises:
+            PomeloError: If the upstream scan could not be created
         """
         # Check if user already has active scan
         if user_id in self.active_scans:
-            return False
+            return None
 
         # Add user to active scans
         self.active_scans.append(user_id)
-        logger.info(f"Started tracking scan {scan_id} for user {user_id}")
+
+        listener = ScanListener(user_id, on_status, on_complete, on_error)
+        flight = self.flights.get(key)
+
+        if flight is None:
+            flight = ScanFlight(key)
+            flight.created = asyncio.ensure_future(self._create_scan(flight, create_scan))
+            self.flights[key] = flight
+        else:
+            logger.info(f"User {user_id} joined in-flight scan {flight.scan_id or key}")
+
+        flight.listeners.append(listener)
+
+        try:
+            await asyncio.shield(flight.created)
+        except BaseException:
+            self._remove_listener(flight, listener)
+            raise
+
+        logger.info(f"Started tracking scan {flight.scan_id} for user {user_id}")
+
+        # Late joiner: catch up with the current progress
+        if flight.last_status is not None and listener in flight.listeners:
+            await on_status(flight.last_status, None)
+
+        return flight.scan_id
+
+    async def _create_scan(
+        self,
+        flight: ScanFlight,
+        create_scan: Callable[[], Awaitable[ScanEntity]]
+    ) -> ScanEntity:
+        """Create upstream scan once per flight and subscribe to its status updates"""
+        scan_entity = await create_scan()
+        if not scan_entity.id:
+            raise PomeloAPIError("Upstream did not return scan ID")
+
+        flight.scan_id = scan_entity.id
+        logger.info(f"Created scan {flight.scan_id} for key {flight.key[:16]}")
 
         # Internal callback for SSE status updates
-        async def handle_status_update(status: str):
+        async def process_status_update(status: str):
             """Process status update from SSE"""
-            logger.info(f"Scan {scan_id}: status '{status}'")
+            logger.info(f"Scan {flight.scan_id}: status '{status}'")
+            flight.last_status = status
 
             # Handle error statuses
-            if status in ("failed", "analysis_failed", "recognition_failed"):
-                await on_error(f"Scan failed: {status}")
-                self._cleanup_scan(scan_id, user_id)
+            if status in self.FAILED_STATUSES:
+                await self._finish_flight(flight, "on_error", f"Scan failed: {status}")
                 return
 
             # Handle completion statuses
-            if status in ("completed", "ai_analysis_completed"):
+            if status in self.COMPLETED_STATUSES:
                 # Fetch full scan result
-                scan_entity = await self.pomelo_service.getScanResult(scan_id)
+                scan_entity = await self.pomelo_service.getScanResult(flight.scan_id)
 
                 # Check if scan is fully completed
                 if not scan_entity.is_fully_completed():
-                    logger.info(f"Scan {scan_id} almost done, waiting for AI analysis...")
+                    logger.info(f"Scan {flight.scan_id} almost done, waiting for AI analysis...")
                     return
 
-                logger.info(f"Scan {scan_id} fully completed")
+                logger.info(f"Scan {flight.scan_id} fully completed, notifying {len(flight.listeners)} chat(s)")
 
                 # Notify about completion
-                await on_complete(scan_entity)
-                self._cleanup_scan(scan_id, user_id)
+                await self._finish_flight(flight, "on_complete", scan_entity)
             else:
                 # Notify about status change
-                await on_status(status, None)
+                await self._fan_out([l.on_status for l in flight.listeners], status, None)
+
+        async def handle_status_update(status: str):
+            """Process status update, any failure (e.g. fetching the result) finishes the scan with an error"""
+            try:
+                await process_status_update(status)
+            except Exception as e:
+                logger.error(f"Failed to process status '{status}' of scan {flight.scan_id}: {e}")
+                await self._finish_flight(flight, "on_error", f"Failed to get scan result: {e}")
 
         # Internal callback for SSE errors
         async def handle_error(error: str):
             """Process SSE connection error"""
-            logger.error(f"SSE connection error for scan {scan_id}: {error}")
-            await on_error(f"Connection error: {error}")
-            self._cleanup_scan(scan_id, user_id)
+            logger.error(f"SSE connection error for scan {flight.scan_id}: {error}")
+            await self._finish_flight(flight, "on_error", f"Connection error: {error}")
+
+        # Scan resumed after restart may have finished already, SSE would stay silent then.
+        # scan_entity is the full result in that case, finish the flight with it directly
+        status = scan_entity.status
+        if status in self.FAILED_STATUSES:
+            flight.task = asyncio.create_task(self._finish_flight(flight, "on_error", f"Scan failed: {status}"))
+            return scan_entity
+        if status in self.COMPLETED_STATUSES and scan_entity.is_fully_completed():
+            flight.task = asyncio.create_task(self._finish_flight(flight, "on_complete", scan_entity))
+            return scan_entity
 
         # Subscribe to status updates
-        asyncio.create_task(
+        flight.task = asyncio.create_task(
             self.pomelo_service.subscribeScanStatusUpdate(
-                scan_id, handle_status_update, handle_error
+                flight.scan_id, handle_status_update, handle_error
             )
         )
 
-        return True
+        return scan_entity
 
-    def _cleanup_scan(self, scan_id: str, user_id: str) -> None:
-        """Clean up resources after scan completion"""
-        # Remove from active scans
-        if user_id in self.active_scans:
-            self.active_scans.remove(user_id)
-            logger.info(f"User {user_id} removed from active scans")
+    @staticmethod
+    async def _fan_out(callbacks: list, *args) -> None:
+        """Call every listener callback, one failing chat must not affect the others"""
+        results = await asyncio.gather(*(callback(*args) for callback in callbacks), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Scan listener callback failed: {result}")
+
+    def _remove_listener(self, flight: ScanFlight, listener: ScanListener) -> None:
+        """Detach a single listener, drop the flight if nobody waits for it anymore"""
+        if listener in flight.listeners:
+            flight.listeners.remove(listener)
+        self._release_user(listener.user_id)
+
+        if not flight.listeners and self.flights.get(flight.key) is flight:
+            del self.flights[flight.key]
+
+    async def _finish_flight(self, flight: ScanFlight, callback: str, *args) -> None:
+        """
+        Finish flight: notify every listener with the outcome and free their users.
+        Requests arriving from now on start a fresh scan.
+        """
+        if self.flights.get(flight.key) is flight:
+            del self.flights[flight.key]
 
         # Unsubscribe from updates
-        self.pomelo_service.unsubscribeFromStatusUpdates(scan_id)
-        logger.info(f"Unsubscribed from scan {scan_id} updates")
+        if flight.scan_id:
+            self.pomelo_service.unsubscribeFromStatusUpdates(flight.scan_id)
+            logger.info(f"Unsubscribed from scan {flight.scan_id} updates")
+
+        listeners, flight.listeners = flight.listeners, []
+        try:
+            await self._fan_out([getattr(listener, callback) for listener in listeners], *args)
+        finally:
+            for listener in listeners:
+                self._release_user(listener.user_id)
 
+    async def cancel_scan(self, scan_id: str, reason: str) -> bool:
+        """
+        Force-finish a stuck scan: its subscription is cancelled, listeners get an error and their users are freed
+
+        Returns:
+            True if scan was tracked and cancelled
+        """
+        for flight in list(self.flights.values()):
+            if flight.scan_id == scan_id:
+                logger.warning(f"Cancelling scan {scan_id}: {reason}")
+                # Stuck stream never delivers another event, so the unsubscribe flag alone would not stop it
+                if flight.task is not None and not flight.task.done():
+                    flight.task.cancel()
+                await self._finish_flight(flight, "on_error", reason)
+                return True
+        return False
+
+    def _release_user(self, user_id: str) -> None:
+        """Remove user from active scans"""
+        if user_id in self.active_scans:
+            self.active_scans.remove(user_id)
+            logger.info(f"User {user_id} removed from active scans")